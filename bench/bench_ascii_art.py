@@ -0,0 +1,103 @@
+# ascii_art 帧编码基准：旧 object 查找表 vs 整数索引编码器
+import os
+import re
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from ascii_art import (  # noqa: E402
+    ASCII_CHARS, ANSI_COLOR_PREFIX, ANSI_RESET,
+    generate_grayscale_frame, generate_colored_frame, _color_index,
+)
+
+_GRIDS = [(200, 60), (400, 120)]
+_FRAMES = 60
+
+
+def _legacy_lookup(chars):
+    # 旧实现的 256 级灰度 -> 字符查找表（dtype=object）
+    return np.array([chars[i * len(chars) // 256] for i in range(256)], dtype=object)
+
+
+def _legacy_tables(chars):
+    # 旧实现：dtype=object 字符串查找表
+    gray = _legacy_lookup(chars)
+    n = len(chars)
+    color = np.empty((64, 256), dtype=object)
+    for ci in range(64):
+        rc = min(255, (((ci >> 4) & 0b11) << 6) + 2)
+        gc = min(255, (((ci >> 2) & 0b11) << 6) + 2)
+        bc = min(255, ((ci & 0b11) << 6) + 2)
+        for v in range(256):
+            color[ci, v] = f"{ANSI_COLOR_PREFIX}{rc};{gc};{bc}m{chars[v * n // 256]}"
+    return gray, color
+
+
+def _legacy_gray(lookup, pixels):
+    return "\n".join("".join(row) for row in lookup[pixels])
+
+
+def _legacy_color(lookup, pixels, lum):
+    ci = _color_index(pixels[..., 0], pixels[..., 1], pixels[..., 2])
+    return "\n".join("".join(row) + ANSI_RESET for row in lookup[ci, lum])
+
+
+_SGR = re.compile(r"\033\[([0-9;]*)m")
+
+
+def _cells(text):
+    # 彩色帧 -> 每行 [(颜色参数, 字符)]，用于比较不同转义写法的可见结果
+    rows = []
+    for line in text.split("\n"):
+        color, cells, pos = None, [], 0
+        for m in _SGR.finditer(line):
+            cells += [(color, ch) for ch in line[pos:m.start()]]
+            color, pos = m.group(1), m.end()
+        cells += [(color, ch) for ch in line[pos:]]
+        rows.append(cells)
+    return rows
+
+
+def _smooth(rng, shape):
+    # 模糊噪声近似真实画面的颜色连续性
+    img = cv2.GaussianBlur(rng.integers(0, 256, shape, dtype=np.uint8), (0, 0), 4)
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
+
+
+def _time(fn, frames):
+    t0 = time.perf_counter()
+    for f in frames:
+        fn(*f)
+    return (time.perf_counter() - t0) / len(frames) * 1000.0
+
+
+def main():
+    rng = np.random.default_rng(0)
+    gray_lut, color_lut = _legacy_tables(ASCII_CHARS)
+    print(f"字符集: {ASCII_CHARS!r}  每组 {_FRAMES} 帧")
+    for w, h in _GRIDS:
+        lum = [rng.integers(0, 256, (h, w), dtype=np.uint8) for _ in range(_FRAMES)]
+        rgb = [_smooth(rng, (h, w, 3)) for _ in range(_FRAMES)]
+        # 输出一致性校验
+        assert _legacy_gray(gray_lut, lum[0]) == generate_grayscale_frame(lum[0])
+        old_text = _legacy_color(color_lut, rgb[0], lum[0])
+        new_text = generate_colored_frame(rgb[0], lum[0])
+        assert _cells(old_text) == _cells(new_text)
+
+        old_g = _time(lambda p: _legacy_gray(gray_lut, p), [(p,) for p in lum])
+        new_g = _time(generate_grayscale_frame, [(p,) for p in lum])
+        # 彩色路径耗时与旧实现大致持平，收益主要在输出字节数（颜色行程压缩）
+        old_c = _time(lambda p, l: _legacy_color(color_lut, p, l), list(zip(rgb, lum)))
+        new_c = _time(generate_colored_frame, list(zip(rgb, lum)))
+        print(f"{w}x{h} 灰度: 旧 {old_g:7.2f} ms  新 {new_g:7.2f} ms  ({old_g / new_g:5.1f}x)")
+        print(f"{w}x{h} 彩色: 旧 {old_c:7.2f} ms  新 {new_c:7.2f} ms  ({old_c / new_c:5.1f}x)")
+        old_b, new_b = len(old_text.encode("utf-8")), len(new_text.encode("utf-8"))
+        print(f"{w}x{h} 彩色字节/帧: 旧 {old_b}  新 {new_b}  ({old_b / new_b:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
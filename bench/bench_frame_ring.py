@@ -0,0 +1,87 @@
+# 跨进程帧传输基准：multiprocessing.Queue（逐帧 pickle）vs 共享内存帧环（零拷贝读）
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from frame_ring import FrameRing  # noqa: E402
+
+_SHAPES = [(360, 640, 3), (1080, 1920, 3), (2160, 3840, 3)]
+_FRAMES = 120
+_SLOTS = 4
+
+
+def _queue_producer(q, shape, n):
+    # Queue 在后台线程中 pickle，帧不能复用
+    for i in range(n):
+        frame = np.zeros(shape, dtype=np.uint8)
+        frame[0, 0, 0] = i & 0xFF
+        q.put((i, frame))
+    q.put(None)
+
+
+def _ring_producer(ring, shape, n):
+    for i in range(n):
+        slot, view = ring.acquire_write(shape)
+        view[...] = 0
+        view[0, 0, 0] = i & 0xFF
+        ring.publish(slot, i, shape)
+    ring.close()
+    ring.release()
+
+
+def _bench_queue(shape):
+    # 子进程产帧，主进程逐帧取出并读一个像素
+    q = mp.Queue(maxsize=_SLOTS)
+    p = mp.Process(target=_queue_producer, args=(q, shape, _FRAMES))
+    t0 = time.perf_counter()
+    p.start()
+    got = 0
+    while True:
+        item = q.get()
+        if item is None:
+            break
+        i, frame = item
+        assert frame[0, 0, 0] == i & 0xFF
+        got += 1
+    dt = time.perf_counter() - t0
+    p.join()
+    return got / dt
+
+
+def _bench_ring(shape):
+    ring = FrameRing(_SLOTS, int(np.prod(shape)))
+    p = mp.Process(target=_ring_producer, args=(ring, shape, _FRAMES))
+    t0 = time.perf_counter()
+    p.start()
+    got = 0
+    while True:
+        item = ring.acquire_read()
+        if item is None:
+            break
+        slot, seq, frame = item
+        assert frame[0, 0, 0] == seq & 0xFF
+        del frame
+        ring.release_slot(slot)
+        got += 1
+    dt = time.perf_counter() - t0
+    p.join()
+    ring.release()
+    return got / dt
+
+
+def main():
+    # 两种方式的写方都要整帧写入一次（解码/渲染本就如此），差别在于传输与读方
+    for shape in _SHAPES:
+        h, w, _ = shape
+        q = _bench_queue(shape)
+        r = _bench_ring(shape)
+        print(f"{w}x{h}: Queue {q:7.1f} fps | FrameRing {r:7.1f} fps | {r / q:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
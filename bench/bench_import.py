@@ -0,0 +1,58 @@
+# ascii_art 冷启动基准：模块导入耗时与各色深首次编码耗时（冷/热磁盘缓存）
+import os
+import subprocess
+import sys
+import tempfile
+
+_SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+_RUNS = 5
+
+# 依赖模块先行导入，只统计 ascii_art 自身
+_SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+import hashlib, json, threading, numpy, utils
+t0 = time.perf_counter()
+import ascii_art
+t1 = time.perf_counter()
+ascii_art.COLOR_DEPTH = {depth!r}
+ascii_art.get_encoder()
+t2 = time.perf_counter()
+print(f"{{(t1 - t0) * 1000:.2f}} {{(t2 - t1) * 1000:.2f}}")
+"""
+
+
+def _run(cwd, depth):
+    # 新解释器中测一次，返回 (导入 ms, 首次编码器 ms)
+    code = _SNIPPET.format(src=os.path.abspath(_SRC), depth=depth)
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd,
+                         capture_output=True, text=True, check=True).stdout
+    imp, first = out.split()
+    return float(imp), float(first)
+
+
+def _legacy_build_ms():
+    # 旧实现模块加载时构建 object 查找表的耗时
+    import time
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from bench_ascii_art import _legacy_tables
+    t0 = time.perf_counter()
+    _legacy_tables(" .:-=+*#%@")
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    print(f"旧实现导入时构建查找表: {_legacy_build_ms():.2f} ms（reload_charset 同样重建一次）")
+    for depth in ("rgb64", "truecolor", "xterm256", "ansi16"):
+        # 程序目录取启动 CWD，临时目录即全新缓存
+        with tempfile.TemporaryDirectory() as cwd:
+            cold = _run(cwd, depth)
+            warm = [_run(cwd, depth) for _ in range(_RUNS)]
+        imp = min(w[0] for w in warm)
+        first = min(w[1] for w in warm)
+        print(f"{depth:9s} 导入 {imp:6.2f} ms | 首次编码器 冷缓存 {cold[1]:7.2f} ms"
+              f"  热缓存 {first:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 # ASCII 字符画核心
 import os
 import json
+import hashlib
+import threading
 import numpy as np
 
 # onefile 用 exe 同目录，否则代码目录
-from utils import _app_dir
+from utils import _app_dir, _cache_dir, _log
 CONFIG_FILE = os.path.join(_app_dir(), "setting.json")
 
 _DEFAULT_CONFIG = {
@@ -16,7 +18,21 @@ _DEFAULT_CONFIG = {
         "ASCII_CHARS_NUMERIC": " 0123456789",
         "ASCII_CHARS_BLOCK": " ░▒▓█"
     },
-    "Charset": "ASCII_CHARS_10"
+    "Charset": "ASCII_CHARS_10",
+    "ColorDepth": "rgb64",
+    "RenderMode": "ascii",
+    "DeltaRender": True,
+    "AutoLevels": False,
+    "Loop": False,
+    "ParallelExport": True,
+    "Tone": {
+        "Brightness": 0,
+        "Contrast": 1.0,
+        "Gamma": 1.0,
+        "BlackLevel": 0,
+        "WhiteLevel": 255,
+        "Invert": False
+    }
 }
 
 # 配置中记录上次选择目录的键名
@@ -80,13 +96,146 @@ ANSI_RESET = "\033[0m"
 ANSI_COLOR_PREFIX = "\033[38;2;"
 
 
-def make_lookup(chars):
-    # 256 级灰度 -> 字符查找表
-    return np.array([chars[i * len(chars) // 256] for i in range(256)], dtype=object)
+def make_index_lookup(chars, tone=None):
+    # 256 级灰度 -> 字形索引查找表（uint8）；tone 给定时先经色调曲线
+    n = max(1, len(chars))
+    dtype = np.uint8 if n <= 256 else np.uint16
+    levels = np.arange(256) if tone is None else tone_curve(tone).astype(np.intp)
+    return (levels * n // 256).astype(dtype)
 
 
-# 预生成默认 ASCII 字符查找表
-ASCII_LOOKUP = make_lookup(ASCII_CHARS)
+# ---------------------------------------------------------------------------
+# 色调：亮度/对比度/伽马/黑白电平/反相，合成为 256 项曲线后并入字形查找表
+# ---------------------------------------------------------------------------
+TONE_KEY = "Tone"
+DEFAULT_TONE = dict(_DEFAULT_CONFIG[TONE_KEY])
+
+# 参数名 -> (下限, 上限)
+_TONE_RANGES = {
+    "Brightness": (-255, 255),
+    "Contrast": (0.0, 4.0),
+    "Gamma": (0.1, 5.0),
+    "BlackLevel": (0, 254),
+    "WhiteLevel": (1, 255),
+}
+
+
+def normalize_tone(tone):
+    # 补齐缺省值、类型转换并截断到合法范围（黑电平始终低于白电平）
+    out = dict(DEFAULT_TONE)
+    if isinstance(tone, dict):
+        for key, (lo, hi) in _TONE_RANGES.items():
+            try:
+                value = type(DEFAULT_TONE[key])(tone.get(key, out[key]))
+            except (TypeError, ValueError):
+                continue
+            out[key] = min(hi, max(lo, value))
+        out["Invert"] = bool(tone.get("Invert", False))
+    if out["BlackLevel"] >= out["WhiteLevel"]:
+        out["BlackLevel"] = out["WhiteLevel"] - 1
+    return out
+
+
+def tone_curve(tone):
+    # 色调参数 -> 256 项 uint8 曲线（电平 -> 伽马 -> 对比度 -> 亮度 -> 反相）
+    t = normalize_tone(tone)
+    x = np.arange(256, dtype=np.float64)
+    x = np.clip((x - t["BlackLevel"]) / (t["WhiteLevel"] - t["BlackLevel"]), 0.0, 1.0)
+    x = x ** (1.0 / t["Gamma"])
+    x = (x - 0.5) * t["Contrast"] + 0.5 + t["Brightness"] / 255.0
+    x = np.clip(x, 0.0, 1.0)
+    if t["Invert"]:
+        x = 1.0 - x
+    return np.rint(x * 255.0).astype(np.uint8)
+
+
+def load_tone():
+    # 从配置文件读取色调参数
+    return normalize_tone(_read_config().get(TONE_KEY))
+
+
+AUTO_LEVELS_KEY = "AutoLevels"
+
+
+def load_auto_levels():
+    # 从配置文件读取是否启用自动电平
+    return bool(_read_config().get(AUTO_LEVELS_KEY, False))
+
+
+class AutoLevels:
+    # 自动电平：逐帧统计缩放后灰度网格的直方图，取高低百分位作黑/白电平
+    # 百分位按帧指数平滑防止亮度抽动；取整后的电平变化超过 step 才重建 256 项曲线
+
+    SAMPLES = 8192
+
+    def __init__(self, tone=None, low=1.0, high=99.0, smoothing=0.15, min_span=48, step=2):
+        self.low = low / 100.0
+        self.high = high / 100.0
+        self.smoothing = smoothing
+        self.min_span = min_span
+        self.step = step
+        self._black = None
+        self._white = None
+        self.set_base(tone)
+
+    def set_base(self, tone):
+        # 更新基础色调（黑/白电平由自动电平接管）
+        self.base = normalize_tone(tone)
+        levels = (self.base["BlackLevel"], self.base["WhiteLevel"])
+        if self._black is not None:
+            levels = self._levels()
+        self._apply(*levels)
+
+    def reset(self):
+        # 丢弃平滑状态（跳转/切换视频后从下一帧重新统计）
+        self._black = self._white = None
+
+    def _levels(self):
+        black, white = int(round(self._black)), int(round(self._white))
+        if white - black < self.min_span:
+            # 画面过平时限制拉伸幅度，避免放大噪声
+            mid = (black + white) // 2
+            black = max(0, min(255 - self.min_span, mid - self.min_span // 2))
+            white = black + self.min_span
+        return black, white
+
+    def _apply(self, black, white):
+        self.tone = dict(self.base, BlackLevel=black, WhiteLevel=white)
+        self.curve = tone_curve(self.tone)
+        self.applied = (black, white)
+
+    def update(self, luminance):
+        # 统计一帧亮度网格；曲线有变化返回 True
+        # 大网格隔行隔列抽样（约 8K 像素），百分位精度足够而直方图开销固定
+        stride = max(1, int(np.ceil(np.sqrt(luminance.size / self.SAMPLES))))
+        sample = luminance[::stride, ::stride] if stride > 1 else luminance
+        cdf = np.cumsum(np.bincount(sample.ravel(), minlength=256))
+        total = cdf[-1]
+        if total <= 0:
+            return False
+        black, white = np.searchsorted(cdf, (total * self.low, total * self.high)).astype(float)
+        if self._black is None:
+            self._black, self._white = black, white
+        else:
+            a = self.smoothing
+            self._black += a * (black - self._black)
+            self._white += a * (white - self._white)
+        levels = self._levels()
+        old_black, old_white = self.applied
+        if abs(levels[0] - old_black) < self.step and abs(levels[1] - old_white) < self.step:
+            return False
+        self._apply(*levels)
+        return True
+
+
+def _pack_utf8(strings):
+    # 字符串列表 -> (N, L) 定长 UTF-8 字节表（短项以 0 补齐）与是否等宽
+    encoded = [s.encode("utf-8") for s in strings]
+    width = max(1, max((len(b) for b in encoded), default=1))
+    table = np.zeros((len(encoded), width), dtype=np.uint8)
+    for i, b in enumerate(encoded):
+        table[i, :len(b)] = np.frombuffer(b, dtype=np.uint8)
+    return table, all(len(b) == width for b in encoded)
 
 
 # 颜色量化级数（每通道位数）：2bit -> 4 级/通道，共 64 色
@@ -96,25 +245,15 @@ _LEVEL_SHIFT = 8 - _COLOR_QBITS
 _LEVEL_HALF = 1 << (_COLOR_QBITS - 1)
 
 
-def _build_ansi_lookup(chars):
-    # (颜色索引, 亮度) -> ANSI 字符串 查找表
-    n = len(chars)
-    table = np.empty((_N_COLOR_LEVELS, 256), dtype=object)
-    for ci in range(_N_COLOR_LEVELS):
-        r = ((ci >> (2 * _COLOR_QBITS)) & 0b11) << _LEVEL_SHIFT
-        g = ((ci >> _COLOR_QBITS) & 0b11) << _LEVEL_SHIFT
-        b = (ci & 0b11) << _LEVEL_SHIFT
-        rc = min(255, r + _LEVEL_HALF)
-        gc = min(255, g + _LEVEL_HALF)
-        bc = min(255, b + _LEVEL_HALF)
-        for v in range(256):
-            ch = chars[v * n // 256]
-            table[ci, v] = f"{ANSI_COLOR_PREFIX}{rc};{gc};{bc}m{ch}"
-    return table
+_DECIMALS = None
 
 
-# 默认字符集彩色查找表（模块加载时一次）
-ANSI_COLOR_LOOKUP = _build_ansi_lookup(ASCII_CHARS)
+def _decimal_table(n):
+    # 0..n-1 的十进制 ASCII 字节表（0 补齐）
+    global _DECIMALS
+    if _DECIMALS is None or len(_DECIMALS) < n:
+        _DECIMALS, _ = _pack_utf8([str(i) for i in range(max(n, 1024))])
+    return _DECIMALS
 
 
 def _color_index(r, g, b):
@@ -125,27 +264,665 @@ def _color_index(r, g, b):
     return ri + gi + bi
 
 
+# ---------------------------------------------------------------------------
+# 色深引擎
+# ---------------------------------------------------------------------------
+# 3D 查找表每通道位数：32x32x32 格，量化误差远小于调色板间距
+_LUT_BITS = 5
+_LUT_SHIFT = 8 - _LUT_BITS
+
+COLOR_DEPTH_KEY = "ColorDepth"
+DEFAULT_COLOR_DEPTH = "rgb64"
+COLOR_DEPTHS = {
+    "rgb64": "64 色",
+    "truecolor": "真彩色",
+    "xterm256": "256 色",
+    "ansi16": "16 色",
+}
+
+# xterm 16 色默认调色板
+_ANSI16_PALETTE = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+]
+_XTERM_CUBE = (0, 95, 135, 175, 215, 255)
+
+
+def _lut_grid():
+    # 3D 查找表各格中心的 RGB 值，形状 (N, N, N, 3)
+    n = 1 << _LUT_BITS
+    centers = (np.arange(n) << _LUT_SHIFT) + (1 << _LUT_SHIFT) // 2
+    r, g, b = np.meshgrid(centers, centers, centers, indexing="ij")
+    return np.stack([r, g, b], axis=-1)
+
+
+def _nearest_lut(palette, offset=0):
+    # 调色板 -> 3D 最近色查找表（索引加 offset）
+    grid = _lut_grid().reshape(-1, 1, 3).astype(np.int32)
+    pal = np.asarray(palette, dtype=np.int32).reshape(1, -1, 3)
+    nearest = np.empty(grid.shape[0], dtype=np.intp)
+    step = 4096
+    for i in range(0, grid.shape[0], step):
+        d = ((grid[i:i + step] - pal) ** 2).sum(axis=2)
+        nearest[i:i + step] = d.argmin(axis=1)
+    n = 1 << _LUT_BITS
+    dtype = np.uint8 if len(palette) + offset <= 256 else np.uint16
+    return (nearest + offset).astype(dtype).reshape(n, n, n)
+
+
+class ColorEngine:
+    # 色深引擎：RGB -> 调色板索引（预计算 3D 查找表）-> 预编译前景/背景转义表
+
+    def __init__(self, name, lut, fg, bg):
+        self.name = name
+        self.lut = lut
+        self.fg = fg
+        self.bg = bg
+
+    def tables(self):
+        # 需持久化的表（写入磁盘缓存）
+        return {"lut": self.lut, "fg": self.fg, "bg": self.bg}
+
+    @property
+    def label(self):
+        return COLOR_DEPTHS.get(self.name, self.name)
+
+    @property
+    def width(self):
+        # 单条前景转义的最大字节数
+        return self.fg.shape[1]
+
+    def quantize(self, pixels):
+        # RGB 像素网格 -> 调色板索引网格（三通道拼成平铺下标后一次 take，快于三维花式索引）
+        q = pixels >> _LUT_SHIFT
+        key = q[..., 0].astype(np.intp)
+        key <<= _LUT_BITS
+        key |= q[..., 1]
+        key <<= _LUT_BITS
+        key |= q[..., 2]
+        return self.lut.reshape(-1).take(key)
+
+    def escape(self, values, background=False):
+        # 调色板索引 -> (n, L) 转义字节（0 补齐）
+        return (self.bg if background else self.fg)[values]
+
+
+class TrueColorEngine(ColorEngine):
+    # 真彩色：索引即 0xRRGGBB，转义由三通道十进制表逐列拼出
+
+    def __init__(self):
+        self.name = "truecolor"
+        self.lut = None
+        digits = _decimal_table(256)[:256, :3]
+        self._digits = digits
+        self._fg_prefix = np.frombuffer(b"\033[38;2;", dtype=np.uint8)
+        self._bg_prefix = np.frombuffer(b"\033[48;2;", dtype=np.uint8)
+        self.fg = self.bg = None
+
+    def tables(self):
+        # 逐列拼接，无需持久化的表
+        return None
+
+    @property
+    def width(self):
+        return len(self._fg_prefix) + 3 * 3 + 3
+
+    def quantize(self, pixels):
+        p = pixels.astype(np.uint32)
+        return (p[..., 0] << 16) | (p[..., 1] << 8) | p[..., 2]
+
+    def escape(self, values, background=False):
+        prefix = self._bg_prefix if background else self._fg_prefix
+        pl = len(prefix)
+        out = np.zeros((len(values), self.width), dtype=np.uint8)
+        out[:, :pl] = prefix
+        for k, shift in enumerate((16, 8, 0)):
+            col = pl + k * 4
+            out[:, col:col + 3] = self._digits[(values >> shift) & 0xFF]
+            out[:, col + 3] = ord(";") if k < 2 else ord("m")
+        return out
+
+
+def _rgb64_engine():
+    # 原 64 色：每通道 2bit，代表色以 24 位转义输出
+    levels = [min(255, (i << _LEVEL_SHIFT) + _LEVEL_HALF) for i in range(1 << _COLOR_QBITS)]
+    colors = [(levels[(ci >> (2 * _COLOR_QBITS)) & 0b11],
+               levels[(ci >> _COLOR_QBITS) & 0b11],
+               levels[ci & 0b11]) for ci in range(_N_COLOR_LEVELS)]
+    grid = _lut_grid().astype(np.uint8)
+    lut = _color_index(grid[..., 0], grid[..., 1], grid[..., 2]).astype(np.uint8)
+    fg = [f"{ANSI_COLOR_PREFIX}{r};{g};{b}m" for r, g, b in colors]
+    bg = [f"\033[48;2;{r};{g};{b}m" for r, g, b in colors]
+    return ColorEngine("rgb64", lut, _pack_utf8(fg)[0], _pack_utf8(bg)[0])
+
+
+def _xterm256_engine():
+    # xterm 256 色：只匹配 6x6x6 立方与 24 级灰阶（16 系统色随主题变化，不参与）
+    palette = [(r, g, b) for r in _XTERM_CUBE for g in _XTERM_CUBE for b in _XTERM_CUBE]
+    palette += [(8 + 10 * i,) * 3 for i in range(24)]
+    lut = _nearest_lut(palette, offset=16)
+    fg = [f"\033[38;5;{i}m" for i in range(256)]
+    bg = [f"\033[48;5;{i}m" for i in range(256)]
+    return ColorEngine("xterm256", lut, _pack_utf8(fg)[0], _pack_utf8(bg)[0])
+
+
+def _ansi16_engine():
+    # ANSI 16 色：30-37/90-97 前景，40-47/100-107 背景
+    lut = _nearest_lut(_ANSI16_PALETTE)
+    fg = [f"\033[{30 + i if i < 8 else 82 + i}m" for i in range(16)]
+    bg = [f"\033[{40 + i if i < 8 else 92 + i}m" for i in range(16)]
+    return ColorEngine("ansi16", lut, _pack_utf8(fg)[0], _pack_utf8(bg)[0])
+
+
+_ENGINE_BUILDERS = {
+    "rgb64": _rgb64_engine,
+    "truecolor": TrueColorEngine,
+    "xterm256": _xterm256_engine,
+    "ansi16": _ansi16_engine,
+}
+_ENGINES = {}
+_ENGINE_LOCK = threading.Lock()
+# 表结构或调色板变化时递增，使旧磁盘缓存失效
+_TABLE_CACHE_VERSION = 1
+
+
+def _engine_cache_file(name):
+    # 色深引擎磁盘缓存路径（按色深与量化参数取键）
+    key = repr((_TABLE_CACHE_VERSION, name, _LUT_BITS, _COLOR_QBITS, _LEVEL_HALF))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(_cache_dir(), f"color-{name}-{digest}.npz")
+
+
+def _load_engine(name):
+    # 从磁盘缓存载入色深引擎，失败返回 None
+    path = _engine_cache_file(name)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return ColorEngine(name, data["lut"], data["fg"], data["bg"])
+    except Exception as e:
+        _log(f"色深缓存无效，重新构建: {path} ({e})")
+        return None
+
+
+def _save_engine(engine):
+    # 写入磁盘缓存（先写临时文件再替换，避免并发读到半截文件）
+    tables = engine.tables()
+    if tables is None:
+        return
+    path = _engine_cache_file(engine.name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, **tables)
+        os.replace(tmp, path)
+    except Exception as e:
+        _log(f"色深缓存写入失败: {e}")
+        try:
+            os.remove(tmp)
+        except Exception:
+            pass
+
+
+def color_engine(name):
+    # 按名称取色深引擎：内存 -> 磁盘缓存 -> 现场构建（未知名称回退默认）
+    if name not in _ENGINE_BUILDERS:
+        name = DEFAULT_COLOR_DEPTH
+    engine = _ENGINES.get(name)
+    if engine is not None:
+        return engine
+    with _ENGINE_LOCK:
+        engine = _ENGINES.get(name)
+        if engine is None:
+            engine = _load_engine(name)
+            if engine is None:
+                engine = _ENGINE_BUILDERS[name]()
+                _save_engine(engine)
+            _ENGINES[name] = engine
+    return engine
+
+
+def load_color_depth():
+    # 从配置文件读取色深
+    name = _read_config().get(COLOR_DEPTH_KEY, DEFAULT_COLOR_DEPTH)
+    return name if name in COLOR_DEPTHS else DEFAULT_COLOR_DEPTH
+
+
+_NEWLINE = ord("\n")
+_RESET_BYTES = np.frombuffer(ANSI_RESET.encode("ascii"), dtype=np.uint8)
+_COLOR_TAIL = np.append(_RESET_BYTES, _NEWLINE).astype(np.uint8)
+
+
+def _run_starts(ci):
+    # 颜色索引网格 -> 行程起点掩码（行首或颜色与左邻不同）
+    starts = np.empty(ci.shape, dtype=bool)
+    starts[:, 0] = True
+    np.not_equal(ci[:, 1:], ci[:, :-1], out=starts[:, 1:])
+    return starts
+
+
+def _insert_escapes(flat, pos, esc):
+    # 在字节流 flat 的 pos 处依次插入 esc 各行，并剔除补齐用的 0
+    n, el = esc.shape
+    out = np.empty(flat.size + n * el, dtype=np.uint8)
+    shift = np.zeros(flat.size, dtype=np.intp)
+    shift[pos] = el
+    dest = np.cumsum(shift)
+    dest += np.arange(flat.size)
+    out[dest] = flat
+    # 字形之外的位置按序正好是各条转义：布尔掩码一次填入，免去逐字节构造二维下标
+    gaps = np.ones(out.size, dtype=bool)
+    gaps[dest] = False
+    out[gaps] = esc.reshape(-1)
+    return out.tobytes().translate(None, b"\0")
+
+
+def _color_prefix(engine, ci, bi=None, force=None, within=None):
+    # 颜色行程起点 -> (行, 列, 转义前缀)
+    # 前景/背景各自只在自身行程起点写转义；force 处两者都写，within 之外不写
+    fg_starts = _run_starts(ci)
+    if force is not None:
+        fg_starts |= force
+    if within is not None:
+        fg_starts &= within
+    marks = fg_starts
+    if bi is not None:
+        bg_starts = _run_starts(bi)
+        if force is not None:
+            bg_starts |= force
+        if within is not None:
+            bg_starts &= within
+        marks = fg_starts | bg_starts
+    # 平铺下标取行程起点（快于二维 nonzero）
+    at = np.flatnonzero(marks)
+    rows, cols = np.divmod(at, ci.shape[1])
+    prefix = engine.escape(ci.reshape(-1)[at])
+    if bi is None:
+        return rows, cols, prefix
+    prefix[~fg_starts.reshape(-1)[at]] = 0
+    bg = engine.escape(bi.reshape(-1)[at], background=True)
+    bg[~bg_starts.reshape(-1)[at]] = 0
+    return rows, cols, np.concatenate([prefix, bg], axis=1)
+
+
+class FrameEncoder:
+    # 整数索引帧编码器：亮度 -> 字形索引 -> 整帧写入预分配字节缓冲
+    # 字形按定长 UTF-8 存放，换行按行跨距写入；变长项以 0 补齐，输出时整体剔除
+
+    def __init__(self, chars, color=None, tone=None):
+        self.chars = chars
+        self.color = color or color_engine(DEFAULT_COLOR_DEPTH)
+        self.glyphs, self._uniform = _pack_utf8(chars)
+        self._buffers = {}
+        self.set_tone(tone)
+
+    def set_tone(self, tone):
+        # 色调变化只重建 256 项查找表（字形索引表与盲文点阵表）
+        self.tone = None if tone is None else normalize_tone(tone)
+        self.index_lut = make_index_lookup(self.chars, self.tone)
+        levels = np.arange(256) if self.tone is None else tone_curve(self.tone)
+        self.dot_lut = levels >= BRAILLE_THRESHOLD
+
+    def glyph_indices(self, luminance):
+        # 亮度网格 -> 字形索引网格
+        return self.index_lut[luminance]
+
+    def color_indices(self, pixels):
+        # RGB 像素网格 -> 当前色深的颜色索引网格
+        return self.color.quantize(pixels)
+
+    def _buffer(self, key, rows, stride, tail):
+        # 按网格尺寸复用行缓冲，行尾字节（换行/复位）只在分配时写入一次
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != (rows, stride):
+            buf = np.zeros((rows, stride), dtype=np.uint8)
+            buf[:, stride - len(tail):] = tail
+            self._buffers[key] = buf
+        return buf
+
+    def _fill_glyphs(self, key, idx, tail):
+        # 字形索引网格写入行缓冲，返回 (缓冲, 行跨距)
+        h, w = idx.shape
+        gl = self.glyphs.shape[1]
+        stride = w * gl + len(tail)
+        buf = self._buffer(key, h, stride, tail)
+        cells = buf[:, :w * gl].reshape(h, w, gl)
+        np.take(self.glyphs, idx, axis=0, out=cells, mode="clip")
+        return buf, stride
+
+    def encode_gray(self, idx):
+        # 字形索引网格 -> 灰度帧 UTF-8 字节
+        buf, _ = self._fill_glyphs("gray", idx, [_NEWLINE])
+        data = buf.reshape(-1)[:-1]
+        if not self._uniform:
+            return data.tobytes().translate(None, b"\0")
+        return data.tobytes()
+
+    def encode_color(self, idx, ci, bi=None):
+        # 字形索引 + 前景（可选背景）颜色索引网格 -> 彩色帧 UTF-8 字节
+        # 仅在行首与量化颜色变化处写颜色转义（行程压缩），每行末尾复位颜色
+        buf, stride = self._fill_glyphs("color", idx, _COLOR_TAIL)
+        rows, cols, prefix = _color_prefix(self.color, ci, bi)
+        pos = rows * stride + cols * self.glyphs.shape[1]
+        return _insert_escapes(buf.reshape(-1)[:-1], pos, prefix)
+
+    def encode(self, idx, ci=None, bi=None):
+        # 按网格种类选择灰度/彩色编码
+        if ci is None:
+            return self.encode_gray(idx)
+        return self.encode_color(idx, ci, bi)
+
+
+# 增量渲染：变化单元占比超过该值时整屏重绘
+_DELTA_FULL_RATIO = 0.4
+# 同行两段变化间距不超过该单元数时合并，省去一次光标定位
+_DELTA_MERGE_GAP = 6
+_CSI = np.frombuffer(b"\033[", dtype=np.uint8)
+
+
+def _spans(changed, gap):
+    # 变化掩码 -> 覆盖掩码（逐行变化段，间距 <= gap 的相邻段合并）
+    h, w = changed.shape
+    edges = np.zeros((h, w + 2), dtype=np.int8)
+    edges[:, 1:-1] = changed
+    d = np.diff(edges, axis=1)
+    rs, cs = np.nonzero(d == 1)
+    _, ce = np.nonzero(d == -1)
+    merge = (rs[1:] == rs[:-1]) & (cs[1:] - ce[:-1] <= gap)
+    keep_s = np.ones(len(cs), dtype=bool)
+    keep_e = np.ones(len(cs), dtype=bool)
+    keep_s[1:] = ~merge
+    keep_e[:-1] = ~merge
+    marks = np.zeros((h, w + 1), dtype=np.int32)
+    np.add.at(marks, (rs[keep_s], cs[keep_s]), 1)
+    np.add.at(marks, (rs[keep_e], ce[keep_e]), -1)
+    return np.cumsum(marks[:, :w], axis=1) > 0
+
+
+class DeltaRenderer:
+    # 帧间增量渲染：保留上一帧字形/颜色索引网格，只输出变化区段
+    # 每段以光标定位开头（彩色段再补一次颜色转义），变化过多时整屏重绘
+
+    def __init__(self, full_ratio=_DELTA_FULL_RATIO, merge_gap=_DELTA_MERGE_GAP):
+        self.full_ratio = full_ratio
+        self.merge_gap = merge_gap
+        self.reset()
+
+    def reset(self):
+        # 丢弃上一帧（终端清屏/尺寸变化/编码器切换后调用）
+        self._prev = None
+        self._encoder = None
+
+    def render(self, encoder, idx, ci=None, bi=None):
+        # 返回本帧应写出的字节（整屏重绘以 \033[H 开头）
+        grids = (idx, ci, bi)
+        prev = self._prev
+        full = (encoder is not self._encoder or prev is None
+                or prev[0].shape != idx.shape
+                or any((g is None) != (p is None) for g, p in zip(grids, prev)))
+        if not full:
+            changed = idx != prev[0]
+            for g, p in zip(grids[1:], prev[1:]):
+                if g is not None:
+                    changed |= g != p
+            full = np.count_nonzero(changed) > self.full_ratio * changed.size
+        self._encoder = encoder
+        self._prev = tuple(g.copy() if g is not None else None for g in grids)
+        if full:
+            return b"\033[H" + encoder.encode(idx, ci, bi)
+        if not changed.any():
+            return b""
+        return self._encode_spans(encoder, idx, ci, bi, _spans(changed, self.merge_gap))
+
+    def _encode_spans(self, encoder, idx, ci, bi, cover):
+        # 覆盖区字形按行优先取出，在段首插入光标定位、在颜色行程起点插入转义
+        h, w = idx.shape
+        gl = encoder.glyphs.shape[1]
+        cells = encoder.glyphs[idx[cover]].reshape(-1)
+        left = np.zeros_like(cover)
+        left[:, 1:] = cover[:, :-1]
+        span_start = cover & ~left
+        if ci is not None:
+            rows, cols, colors = _color_prefix(encoder.color, ci, bi,
+                                               force=span_start, within=cover)
+        else:
+            rows, cols = np.nonzero(span_start)
+            colors = np.zeros((len(rows), 0), dtype=np.uint8)
+
+        digits = _decimal_table(max(h, w) + 1)
+        dl = digits.shape[1]
+        cursor = np.zeros((len(rows), 2 * dl + 4), dtype=np.uint8)
+        cursor[:, :2] = _CSI
+        cursor[:, 2:2 + dl] = digits[rows + 1]
+        cursor[:, 2 + dl] = ord(";")
+        cursor[:, 3 + dl:3 + 2 * dl] = digits[cols + 1]
+        cursor[:, 3 + 2 * dl] = ord("H")
+        cursor[~span_start[rows, cols]] = 0
+
+        order = np.cumsum(cover.reshape(-1)) - 1
+        pos = order[rows * w + cols] * gl
+        data = _insert_escapes(cells, pos, np.concatenate([cursor, colors], axis=1))
+        return data + ANSI_RESET.encode("ascii") if ci is not None else data
+
+
+# ---------------------------------------------------------------------------
+# 子单元渲染模式
+# ---------------------------------------------------------------------------
+RENDER_MODE_KEY = "RenderMode"
+DEFAULT_RENDER_MODE = "ascii"
+RENDER_MODES = {
+    "ascii": "字符",
+    "halfblock": "半块",
+    "braille": "盲文点阵",
+}
+# 每个终端单元对应的像素（列, 行）
+_CELL_PIXELS = {"ascii": (1, 1), "halfblock": (1, 2), "braille": (2, 4)}
+
+HALF_BLOCK = "\u2580"
+BRAILLE_CHARS = "".join(chr(0x2800 + i) for i in range(256))
+# 2x4 点阵按 (行, 列) 展平后各点对应的盲文位（点 1-8）
+_BRAILLE_BITS = np.array([0, 3, 1, 4, 2, 5, 6, 7])
+_BRAILLE_ORDER = np.argsort(_BRAILLE_BITS)
+BRAILLE_THRESHOLD = 128
+
+
+def cell_pixels(mode):
+    # 渲染模式每单元像素数 (列, 行)
+    return _CELL_PIXELS.get(mode, (1, 1))
+
+
+def halfblock_colors(engine, pixels):
+    # (2h, w, 3) RGB -> 上半像素前景、下半像素背景颜色索引网格
+    return engine.quantize(pixels[0::2]), engine.quantize(pixels[1::2])
+
+
+def braille_indices(luminance, threshold=BRAILLE_THRESHOLD, dot_lut=None):
+    # (4h, 2w) 亮度 -> 盲文码位低 8 位（阈值化后按点位打包）
+    # dot_lut：256 项布尔表（已含色调曲线），给定时代替阈值比较
+    h, w = luminance.shape[0] // 4, luminance.shape[1] // 2
+    lum = luminance[:h * 4, :w * 2]
+    dots = lum >= threshold if dot_lut is None else dot_lut[lum]
+    dots = dots.reshape(h, 4, w, 2).transpose(0, 2, 1, 3).reshape(h, w, 8)
+    return np.packbits(dots[..., _BRAILLE_ORDER], axis=-1, bitorder="little")[..., 0]
+
+
+def load_render_mode():
+    # 从配置文件读取渲染模式
+    mode = _read_config().get(RENDER_MODE_KEY, DEFAULT_RENDER_MODE)
+    return mode if mode in RENDER_MODES else DEFAULT_RENDER_MODE
+
+
+# 当前色深（查找表在首次编码时才构建）与色调
+COLOR_DEPTH = load_color_depth()
+TONE = load_tone()
+
+# (渲染模式, 字符集, 色深) -> 编码器
+# 注册表后台线程、转换线程与 set_tone/reload_charset 并发读写，建表/换色调/清空都在锁内进行，
+# 避免按旧色调建好的编码器在换色调之后才插入
+_ENCODERS = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def _mode_chars(mode):
+    # 渲染模式使用的字形表
+    if mode == "halfblock":
+        return HALF_BLOCK
+    if mode == "braille":
+        return BRAILLE_CHARS
+    return ASCII_CHARS
+
+
+def _encoder_for(mode, chars, depth):
+    # 取（或构建并缓存）指定渲染模式/字形/色深的编码器
+    key = (mode, chars, depth)
+    with _ENCODERS_LOCK:
+        enc = _ENCODERS.get(key)
+        if enc is None:
+            enc = _ENCODERS[key] = FrameEncoder(chars, color_engine(depth), TONE)
+    return enc
+
+
+def get_encoder(mode=DEFAULT_RENDER_MODE):
+    # 当前字符集/色深下指定渲染模式的编码器（首次使用时构建）
+    # reload_charset / set_color_depth 后返回新编码器，调用方勿长期持有
+    return _encoder_for(mode, _mode_chars(mode), COLOR_DEPTH)
+
+
+def load_charsets():
+    # 配置中的全部字符集 [(名称, 字符串)]，顺序同 setting.json
+    charsets = _read_config().get("CharSets")
+    if isinstance(charsets, dict):
+        items = [(k, v) for k, v in charsets.items() if isinstance(v, str) and v]
+        if items:
+            return items
+    return list(_DEFAULT_CONFIG["CharSets"].items())
+
+
+class EncoderRegistry:
+    # 播放用编码器注册表：后台线程预编译全部字符集（灰度/彩色共用，色深查找表一并就绪）
+    # 热键切换只改目标，目标编码器就绪后才生效，帧循环中不建表
+
+    def __init__(self, mode=DEFAULT_RENDER_MODE, depth=None):
+        self.mode = mode if mode in RENDER_MODES else DEFAULT_RENDER_MODE
+        self.depth = depth or COLOR_DEPTH
+        if self.mode == "ascii":
+            self.charsets = load_charsets()
+        else:
+            # 半块/盲文字形固定，字符集切换无意义
+            self.charsets = [(self.mode, _mode_chars(self.mode))]
+        values = [chars for _name, chars in self.charsets]
+        self.position = values.index(ASCII_CHARS) if ASCII_CHARS in values else 0
+        self._target = self.position
+        self._thread = threading.Thread(target=self._build_all, name="encoder-registry", daemon=True)
+        self._thread.start()
+
+    def _key(self, position):
+        return (self.mode, self.charsets[position][1], self.depth)
+
+    def _build_all(self):
+        # 当前字符集优先，其余按配置顺序构建
+        n = len(self.charsets)
+        for i in range(n):
+            pos = (self.position + i) % n
+            try:
+                _encoder_for(self.mode, self.charsets[pos][1], self.depth)
+            except Exception as e:
+                _log(f"预编译编码器失败: {self.charsets[pos][0]} ({e})")
+        _log(f"编码器预编译完成: {n} 个字符集, 色深 {self.depth}")
+
+    def ready(self, position=None):
+        # 指定位置（默认切换目标）的编码器是否已构建
+        return self._key(self._target if position is None else position) in _ENCODERS
+
+    def wait(self, timeout=None):
+        # 等待后台预编译结束
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def cycle(self, step=1):
+        # 切换到下一个字符集（就绪后由 current 生效）
+        if len(self.charsets) > 1:
+            self._target = (self._target + step) % len(self.charsets)
+
+    def current(self):
+        # 当前编码器；切换目标已就绪则先切换
+        if self._target != self.position and self.ready():
+            self.position = self._target
+        return _encoder_for(self.mode, self.charsets[self.position][1], self.depth)
+
+    @property
+    def name(self):
+        return self.charsets[self.position][0]
+
+
+def color_indices(pixels):
+    # RGB 像素网格 -> 颜色索引网格（当前色深）
+    return get_encoder().color_indices(pixels)
+
+
 def generate_colored_frame(pixels, luminance):
     # 终端 ANSI 彩色字符画
-    ci = _color_index(pixels[..., 0], pixels[..., 1], pixels[..., 2])
-    ansi_grid = ANSI_COLOR_LOOKUP[ci, luminance]
-    lines = ["".join(row) + ANSI_RESET for row in ansi_grid]
-    return "\n".join(lines)
+    enc = get_encoder()
+    ci = enc.color_indices(pixels)
+    idx = enc.glyph_indices(luminance)
+    return enc.encode_color(idx, ci).decode("utf-8")
 
 
 def generate_grayscale_frame(pixels):
     # 灰度 ASCII 字符帧
     if len(pixels.shape) == 3 and pixels.shape[2] == 1:
         pixels = pixels.squeeze(axis=2)
-    chars_grid = ASCII_LOOKUP[pixels]
-    lines = ["".join(row) for row in chars_grid]
-    return "\n".join(lines)
+    enc = get_encoder()
+    idx = enc.glyph_indices(pixels)
+    return enc.encode_gray(idx).decode("utf-8")
 
 
 def reload_charset():
-    # 重读 setting.json 并更新查找表
-    global ASCII_CHARS, ASCII_LOOKUP, ANSI_COLOR_LOOKUP
+    # 重读 setting.json；查找表留待下次编码时按需构建
+    global ASCII_CHARS, COLOR_DEPTH, TONE
     ASCII_CHARS = load_charset()
-    ASCII_LOOKUP = make_lookup(ASCII_CHARS)
-    ANSI_COLOR_LOOKUP = _build_ansi_lookup(ASCII_CHARS)
+    COLOR_DEPTH = load_color_depth()
+    with _ENCODERS_LOCK:
+        TONE = load_tone()
+        _ENCODERS.clear()
+    return ASCII_CHARS
+
+
+def current_charset():
+    # 当前字符集（reload_charset 后更新）
     return ASCII_CHARS
+
+
+def set_color_depth(name):
+    # 切换色深并写入 setting.json
+    global COLOR_DEPTH
+    COLOR_DEPTH = name if name in COLOR_DEPTHS else DEFAULT_COLOR_DEPTH
+    _write_config_value(COLOR_DEPTH_KEY, COLOR_DEPTH)
+    return COLOR_DEPTH
+
+
+def current_tone():
+    # 当前色调参数（副本）
+    return dict(TONE)
+
+
+def set_tone(tone, save=True):
+    # 更新色调：已构建的编码器只重建 256 项查找表；save 时写入 setting.json
+    global TONE
+    with _ENCODERS_LOCK:
+        TONE = normalize_tone(tone)
+        for enc in _ENCODERS.values():
+            enc.set_tone(TONE)
+    if save:
+        _write_config_value(TONE_KEY, TONE)
+    return dict(TONE)
+
+
+def set_render_mode(mode):
+    # 切换渲染模式并写入 setting.json
+    mode = mode if mode in RENDER_MODES else DEFAULT_RENDER_MODE
+    _write_config_value(RENDER_MODE_KEY, mode)
+    return mode
@@ -35,8 +35,9 @@ def _system_sample_rate():
 
 
 
-def start_audio(video_path, log=None):
-    # 后台流式播放音轨
+def start_audio(video_path, log=None, start_seconds=0.0, hold=None):
+    # 后台流式播放音轨；start_seconds：从该时刻起播（跳转/暂停恢复时重启音频）
+    # hold：threading.Event，给定时先启动 ffmpeg、预读首块数据并打开设备，置位后才开始出声（预热下一个视频）
     ffmpeg = _ffmpeg_exe()
     if not ffmpeg:
         _log("音频初始化跳过：未找到 ffmpeg")
@@ -49,7 +50,8 @@ def start_audio(video_path, log=None):
         return None
 
     sample_rate = _system_sample_rate()
-    _log(f"音频初始化: {video_path} | 采样率 {sample_rate} 声道 {_CHANNELS}")
+    _log(f"音频初始化: {video_path} | 采样率 {sample_rate} 声道 {_CHANNELS}"
+         + (f" | 起点 {start_seconds:.2f}s" if start_seconds > 0 else ""))
 
     stop_event = threading.Event()
     started = threading.Event()
@@ -61,8 +63,10 @@ def start_audio(video_path, log=None):
     def _worker():
         import subprocess
 
-        cmd = [
-            ffmpeg, "-nostdin", "-loglevel", "info",
+        cmd = [ffmpeg, "-nostdin", "-loglevel", "info"]
+        if start_seconds > 0:
+            cmd += ["-ss", f"{start_seconds:.6f}"]
+        cmd += [
             "-i", video_path,
             "-vn",
             "-f", "f32le",
@@ -77,6 +81,21 @@ def start_audio(video_path, log=None):
         _forward_stderr(proc, _logfn)
 
         nbytes_per_frame = _CHANNELS * 4
+        # 预热：先读好一个缓冲时长的数据，出声时无需再等 ffmpeg 解码首块
+        preroll = [b""]
+        if hold is not None:
+            preroll[0] = proc.stdout.read(nbytes_per_frame * sample_rate * _BUFFER_MS // 1000)
+
+        def _read(nbytes):
+            # 先取预读数据，再读管道
+            head = preroll[0]
+            if not head:
+                return proc.stdout.read(nbytes)
+            preroll[0] = head[nbytes:]
+            head = head[:nbytes]
+            if len(head) < nbytes:
+                head += proc.stdout.read(nbytes - len(head))
+            return head
 
         def gen():
             # miniaudio 生成器回调：send(framecount) 进，yield 等长 float32 字节
@@ -85,7 +104,7 @@ def start_audio(video_path, log=None):
                 if stop_event.is_set():
                     return
                 nbytes = framecount * nbytes_per_frame
-                raw = proc.stdout.read(nbytes)
+                raw = _read(nbytes)
                 if not raw:
                     ended.set()
                     return
@@ -112,6 +131,10 @@ def start_audio(video_path, log=None):
                 latency[0] = _BUFFER_MS / 1000.0
             g = gen()
             next(g)
+            if hold is not None:
+                while not hold.wait(0.05):
+                    if stop_event.is_set():
+                        return
             device.start(g)
             _log(f"音频播放开始: 延迟 {latency[0]:.3f}s")
             while device.running and not stop_event.is_set() and not ended.is_set():
@@ -1,14 +1,20 @@
 # 统一视频解码器
+import bisect
+import json
+import os
+import queue
 import re
 import subprocess
-import time
+import threading
+from collections import namedtuple
+from fractions import Fraction
 
 import cv2
 import numpy as np
 from utils import (
     clean_fps,
     _forward_stderr, _ffmpeg_exe, _probe_hw_accel,
-    _CREATE_NO_WINDOW, _log, _decode_threads,
+    _CREATE_NO_WINDOW, _log, _decode_threads, _cache_dir,
 )
 
 
@@ -39,41 +45,515 @@ def _fps_flag():
     return flag
 
 
+# ---------------------------------------------------------------------------
+# 媒体探测：单次 ffmpeg -i 按流解析，结果按路径/大小/修改时间缓存到磁盘
+# ---------------------------------------------------------------------------
+# 宽高为解码输出尺寸（已按旋转角交换）；frame_count 由时长 × 帧率估算（近似值，只宜用于进度与分段规划）
+MediaInfo = namedtuple("MediaInfo", [
+    "width", "height", "fps", "frame_count", "duration",
+    "video_codec", "pix_fmt", "rotation",
+    "has_audio", "audio_codec", "sample_rate", "channels",
+])
+
+_STREAM_RE = re.compile(
+    r"^\s*Stream #\d+:\d+(?:\[\w+\])?(?:\([^)]*\))?: (\w+): (.*)$")
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)(?:, start: (-?\d+(?:\.\d+)?))?")
+_INPUT_RE = re.compile(r"^Input #\d+, ([^ ]+), from", re.M)
+# 时长记的是末时间戳（含起始偏移）的容器：估算帧数须先减去 start
+_END_STAMP_FORMATS = ("matroska",)
+_ROTATION_RE = re.compile(r"rotation of (-?\d+(?:\.\d+)?) degrees")
+_CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "quad": 4}
+
+
+def _rate(desc, unit):
+    # 流描述中 "<数值>[k] <单位>" -> 浮点数（如 "29.97 fps"、"1k tbr"）
+    m = re.search(r"(\d+(?:\.\d+)?)(k?) " + unit + r"\b", desc)
+    if not m:
+        return 0.0
+    return float(m.group(1)) * (1000.0 if m.group(2) else 1.0)
+
+
+def _channel_count(desc):
+    # 音频流声道布局 -> 声道数
+    m = re.search(r"\d+ Hz, ([^,]+)", desc)
+    if not m:
+        return 0
+    layout = m.group(1).strip()
+    if layout in _CHANNEL_LAYOUTS:
+        return _CHANNEL_LAYOUTS[layout]
+    mc = re.match(r"(\d+) channels", layout)
+    if mc:
+        return int(mc.group(1))
+    ml = re.match(r"(\d+)\.(\d+)", layout)
+    if ml:
+        return int(ml.group(1)) + int(ml.group(2))
+    return 0
+
+
+def _parse_probe(txt):
+    # 解析 ffmpeg -i 的输入描述：取首个视频流（跳过封面图）与首个音频流
+    info = dict(width=0, height=0, fps=0.0, frame_count=0, duration=0.0,
+                video_codec="", pix_fmt="", rotation=0,
+                has_audio=False, audio_codec="", sample_rate=0, channels=0)
+    md = _DURATION_RE.search(txt)
+    if md:
+        info["duration"] = (int(md.group(1)) * 3600 + int(md.group(2)) * 60
+                            + float(md.group(3)))
+        mi = _INPUT_RE.search(txt)
+        start = float(md.group(4) or 0)
+        if start > 0 and mi and any(f in mi.group(1) for f in _END_STAMP_FORMATS):
+            info["duration"] = max(0.0, info["duration"] - start)
+    video = None
+    current = None
+    for line in txt.splitlines():
+        m = _STREAM_RE.match(line)
+        if m:
+            kind, desc = m.group(1), m.group(2)
+            current = None
+            if kind == "Video" and video is None and "(attached pic)" not in desc:
+                video = current = desc
+                info["video_codec"] = desc.split(" ", 1)[0].rstrip(",")
+                mp = re.match(r"[^,]*, ([0-9a-z_]+)", desc)
+                if mp:
+                    info["pix_fmt"] = mp.group(1)
+                ms = re.search(r", (\d{2,5})x(\d{2,5})\b", desc)
+                if ms:
+                    info["width"], info["height"] = int(ms.group(1)), int(ms.group(2))
+                info["fps"] = clean_fps(_rate(desc, "fps") or _rate(desc, "tbr"))
+            elif kind == "Audio" and not info["has_audio"]:
+                info["has_audio"] = True
+                info["audio_codec"] = desc.split(" ", 1)[0].rstrip(",")
+                info["sample_rate"] = int(_rate(desc, "Hz"))
+                info["channels"] = _channel_count(desc)
+            continue
+        if current is not None:
+            mr = _ROTATION_RE.search(line)
+            if mr:
+                info["rotation"] = int(round(float(mr.group(1)))) % 360
+    if info["rotation"] in (90, 270):
+        # ffmpeg 默认自动旋转，解码输出宽高互换
+        info["width"], info["height"] = info["height"], info["width"]
+    if info["duration"] and info["fps"]:
+        info["frame_count"] = int(round(info["duration"] * info["fps"]))
+    return MediaInfo(**info)
+
+
+class _MediaCache:
+    # 按媒体文件缓存的 JSON 结果（cache/ 下单文件）：键为绝对路径，
+    # 文件大小/修改时间变化即失效；超出条目上限丢弃最早写入的
+
+    def __init__(self, filename, max_entries):
+        self.filename = filename
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = None
+
+    @staticmethod
+    def _key(path):
+        # 缓存键与文件指纹（大小、修改时间）；文件不可访问返回 (None, None)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None
+        return os.path.normcase(os.path.abspath(path)), [st.st_size, st.st_mtime_ns]
+
+    def _load(self):
+        # 惰性读入磁盘缓存
+        if self._data is None:
+            try:
+                with open(os.path.join(_cache_dir(), self.filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._data = data if isinstance(data, dict) else {}
+            except Exception:
+                self._data = {}
+        return self._data
+
+    def get(self, path):
+        # 命中且指纹一致返回缓存值，否则 None
+        key, stamp = self._key(path)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._load().get(key)
+        if entry and entry.get("stamp") == stamp:
+            return entry.get("value")
+        return None
+
+    def put(self, path, value):
+        # 写入并落盘（临时文件替换，避免中途退出留下残缺文件）
+        key, stamp = self._key(path)
+        if key is None:
+            return
+        with self._lock:
+            data = self._load()
+            data.pop(key, None)
+            data[key] = {"stamp": stamp, "value": value}
+            while len(data) > self.max_entries:
+                data.pop(next(iter(data)))
+            target = os.path.join(_cache_dir(), self.filename)
+            try:
+                tmp = target + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, target)
+            except Exception:
+                pass
+
+
+_PROBE_CACHE = _MediaCache("probe.json", 512)
+
+
+def probe_media(path, log=None):
+    # 探测媒体元信息 -> MediaInfo；无 ffmpeg 或无法识别视频流返回 None
+    if not os.path.isfile(path):
+        return None
+    cached = _PROBE_CACHE.get(path)
+    if cached:
+        try:
+            return MediaInfo(**cached)
+        except Exception:
+            pass
+    ff = _ffmpeg_exe()
+    if not ff:
+        return None
+    try:
+        res = subprocess.run(
+            [ff, "-hide_banner", "-i", path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace",
+            creationflags=_CREATE_NO_WINDOW,
+        )
+        info = _parse_probe(res.stderr or "")
+    except Exception as e:
+        (log or _log)(f"媒体探测失败: {e}")
+        return None
+    if info.width <= 0 or info.height <= 0:
+        return None
+    _PROBE_CACHE.put(path, info._asdict())
+    return info
+
+
+def probe_cv2(path):
+    # ffmpeg 探测不到视频流时用 cv2 读元信息 -> MediaInfo（只有宽高/帧率/帧数/时长，音频未知）；打不开返回 None
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = clean_fps(cap.get(cv2.CAP_PROP_FPS))
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    if w <= 0 or h <= 0:
+        return None
+    return MediaInfo(w, h, fps, n, n / fps if fps else 0.0,
+                     "", "", 0, False, "", 0, 0)
+
+
+# ---------------------------------------------------------------------------
+# 关键帧索引：ffmpeg 逐包输出 framecrc（只解封装不解码），后台构建并按文件缓存
+# ---------------------------------------------------------------------------
+_KEYFRAME_CACHE = _MediaCache("keyframes_clean.json", 64)
+
+
+def _parse_framecrc(txt):
+    # framecrc 输出 -> 可干净起解的关键帧时间（秒，升序）
+    # 行格式：流, dts, pts, 时长, 大小, 校验和[, F=标志]；标志仅为关键帧时省略
+    # 行按解码顺序排列：关键帧之后出现 pts 更早的包，说明它带前导帧（开放 GOP），
+    # 从它起解码会多出或缺少前导帧，不能作为跳转/分段起点（流首关键帧除外）
+    tb = None
+    times = []
+    key_pts = None
+    leading = set()
+    for line in txt.splitlines():
+        if line.startswith("#tb 0:"):
+            num, _, den = line.split(":", 1)[1].strip().partition("/")
+            tb = int(num) / int(den or 1)
+            continue
+        if not line or line[0] == "#" or tb is None:
+            continue
+        parts = [p.strip() for p in line.split(",")]
+        if len(parts) < 6 or parts[0] != "0":
+            continue
+        pts = int(parts[2])
+        if len(parts) > 6 and parts[6].startswith("F="):
+            if not int(parts[6][2:], 16) & 1:
+                if key_pts is not None and pts < key_pts and times:
+                    leading.add(len(times) - 1)
+                continue
+        key_pts = pts
+        times.append(max(0.0, pts * tb))
+    return sorted(set(t for i, t in enumerate(times) if i == 0 or i not in leading))
+
+
+def keyframe_times(path, log=None):
+    # 视频流关键帧时间列表（秒）；失败返回 None
+    cached = _KEYFRAME_CACHE.get(path)
+    if isinstance(cached, list):
+        return cached
+    ff = _ffmpeg_exe()
+    if not ff:
+        return None
+    try:
+        res = subprocess.run(
+            [ff, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", path,
+             "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", errors="replace",
+            creationflags=_CREATE_NO_WINDOW,
+        )
+        times = _parse_framecrc(res.stdout or "")
+    except Exception as e:
+        (log or _log)(f"关键帧索引失败: {e}")
+        return None
+    if not times:
+        return None
+    times = [round(t, 6) for t in times]
+    _KEYFRAME_CACHE.put(path, times)
+    return times
+
+
+def keyframe_seek_frame(path, frame_no, fps):
+    # 关键帧跳转（与 FrameReader 的 start_keyframe 相同参数）到 frame_no 时实际从哪一帧起解码；
+    # 只解封装首个包，失败返回 None。部分容器（如 Matroska 按 Cues）会落到更早的关键帧
+    ff = _ffmpeg_exe()
+    if not ff or fps <= 0:
+        return None
+    try:
+        res = subprocess.run(
+            [ff, "-nostdin", "-hide_banner", "-loglevel", "error",
+             "-noaccurate_seek", "-ss", f"{(frame_no + 0.5) / fps:.6f}", "-i", path,
+             "-map", "0:v:0", "-c", "copy", "-copyts", "-frames:v", "1", "-f", "framecrc", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", errors="replace",
+            creationflags=_CREATE_NO_WINDOW,
+        )
+    except Exception:
+        return None
+    tb = None
+    for line in (res.stdout or "").splitlines():
+        if line.startswith("#tb 0:"):
+            num, _, den = line.split(":", 1)[1].strip().partition("/")
+            tb = int(num) / int(den or 1)
+        elif line and line[0] != "#" and tb is not None:
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) >= 3:
+                return int(round(int(parts[2]) * tb * fps))
+    return None
+
+
+class KeyframeIndex:
+    # 后台构建的关键帧索引；就绪前 snap 返回 None，调用方退回精确跳转
+
+    def __init__(self, path, log=None):
+        self.path = path
+        self._log = log or _log
+        self._times = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._build, name="keyframe-index", daemon=True).start()
+
+    def _build(self):
+        try:
+            self._times = keyframe_times(self.path, self._log)
+            if self._times:
+                self._log(f"关键帧索引: {len(self._times)} 个关键帧")
+        except Exception:
+            self._times = None
+        self._ready.set()
+
+    def ready(self):
+        return self._ready.is_set() and bool(self._times)
+
+    def snap(self, target, current, direction):
+        # 目标时刻 -> 最近关键帧时刻；保证朝 direction（+1/-1）方向移动，无合适关键帧返回 None
+        if not self.ready():
+            return None
+        times = self._times
+        i = bisect.bisect_left(times, target)
+        nearest = [times[j] for j in (i - 1, i) if 0 <= j < len(times)]
+        nearest.sort(key=lambda t: abs(t - target))
+        for t in nearest:
+            if (t - current) * direction > 0:
+                return t
+        if direction > 0:
+            j = bisect.bisect_right(times, current)
+            return times[j] if j < len(times) else None
+        j = bisect.bisect_left(times, current) - 1
+        return times[j] if j >= 0 else None
+
+
+# 解码管道首帧等待上限（秒），超时回退下一解码后端
+_LAUNCH_TIMEOUT = 10.0
+# 还有后备项的硬件解码候选的首帧等待上限（秒）：正常的硬件初始化远低于此，失败不必等满 _LAUNCH_TIMEOUT
+_HW_LAUNCH_TIMEOUT = 3.0
+
+# 本次运行中启动失败的 (解码后端, 视频编码) ：之后的启动（跳转、循环、换尺寸）直接跳过，不再逐个等超时
+_FAILED_BACKENDS = set()
+
+# 支持的输出像素格式 -> 每像素字节数
+PIX_FMTS = {"bgr24": 3, "gray": 1}
+
+
+def _stop_proc(proc, wait=True):
+    # 终止 ffmpeg 解码进程（标记主动终止，不转发其收尾报错）
+    # wait=False 时在后台线程回收，调用方不必等进程退出
+    # 先终止再关 stdout：仍阻塞在读管道的线程（如首帧超时）先得到 EOF 并释放读锁，关闭才不会卡住
+    proc._stopping = True
+    try:
+        proc.terminate()
+    except Exception:
+        pass
+    try:
+        proc.stdout.close()
+    except Exception:
+        pass
+    if not wait:
+        threading.Thread(target=_reap_proc, args=(proc,), daemon=True).start()
+        return
+    _reap_proc(proc)
+
+
+def _reap_proc(proc):
+    # 等进程退出，超时强杀
+    try:
+        proc.wait(timeout=2)
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+class _Standby:
+    # 备用解码管道：进程已定位，首帧由后台线程读入独立缓冲（不占环形槽位）
+
+    def __init__(self, key, proc, shape, reader):
+        self.key = key
+        self.proc = proc
+        self.frame = np.empty(shape, dtype=np.uint8)
+        self._ok = False
+        self._thread = threading.Thread(target=self._fill, args=(reader,),
+                                        name="decoder-standby", daemon=True)
+        self._thread.start()
+
+    def _fill(self, reader):
+        try:
+            self._ok = reader._read_into(self.frame, self.proc)
+        except Exception:
+            self._ok = False
+
+    def wait(self, timeout=_LAUNCH_TIMEOUT):
+        # 等首帧读完；返回是否可用
+        self._thread.join(timeout)
+        return self._ok and not self._thread.is_alive()
+
+    def close(self):
+        _stop_proc(self.proc, wait=False)
+
+
+# 迭代接口产出的帧：index 为源帧号，time 为其时刻（秒，按恒定帧率），image 为帧数据
+Frame = namedtuple("Frame", ["index", "time", "image"])
+
+
+def _ratio(value):
+    # 帧率/抽帧间隔 -> 精确分数（浮点按分母 ≤1001 还原：整数帧率、25/12、NTSC 的 x/1001 等均精确）
+    if isinstance(value, Fraction):
+        return value
+    return Fraction(value).limit_denominator(1001)
+
+
+def sample_interval(src_fps, target_fps):
+    # 抽帧间隔（源帧数/输出帧，≥1）的精确分数；浮点相除在整倍数处会差一帧
+    return max(Fraction(1), _ratio(src_fps) / _ratio(max(0.1, target_fps)))
+
+
+def _sampled(src_no, interval):
+    # 源帧 src_no 是否按抽帧间隔 interval（Fraction p/q）抽中：区间 (src_no, src_no + 1] 内含 interval 的整数倍
+    # 整数运算 floor(k*q/p)，与 _select_filter、导出计数逐帧一致
+    p, q = interval.numerator, interval.denominator
+    return (src_no + 1) * q // p > src_no * q // p
+
+
+def _select_filter(first, interval):
+    # 与 _sampled 等价的 ffmpeg select 表达式（n 为本进程解码出的第 n 帧，对应源帧 first + n）
+    # (n+first)*q 为整数、p 为整数，双精度下 floor 结果精确
+    p, q = interval.numerator, interval.denominator
+    return f"select='gt(floor((n+{first + 1})*{q}/{p}),floor((n+{first})*{q}/{p}))'"
+
+
 class FrameReader:
 
     def __init__(self, video_path, log=None, force_ffmpeg=False, force_size=None,
-                 metadata=None, hwaccel=True, decode_args=None, ffmpeg_usage=None):
+                 metadata=None, hwaccel=True, decode_args=None, ffmpeg_usage=None,
+                 pipe_scale=False, pix_fmt="bgr24", ring=0, threads=None,
+                 start=0, start_keyframe=False, decimate=1):
+        # pipe_scale：播放用，优先 ffmpeg 管道并由 set_output_size 指定缩放尺寸，首次读帧时才启动管道
+        # pix_fmt："bgr24" 输出 (H, W, 3)，"gray" 输出单通道 (H, W) 亮度帧（管道直接输出，省去 2/3 字节）
+        # ring=N（>0）：帧直接读入 N 个预分配缓冲轮流复用，稳态不再逐帧分配；
+        # read 返回的帧在其后 N-1 次 read/grab 内保持有效，需更久持有须自行 copy
+        # threads：指定解码进程线程数（默认按 ffmpeg_usage 分配）
+        # start：从该帧起解码（start_keyframe 表示其为关键帧，见 seek）
+        # decimate：抽帧间隔（源帧数/输出帧），>1 时 read/grab 只返回按 _sampled 抽中的帧；
+        # 管道由 select 滤镜在解码进程内丢弃其余帧（不再缩放/转换/经管道拷贝），cv2 只 grab 不解码
         self.path = video_path
+        self.pix_fmt = pix_fmt if pix_fmt in PIX_FMTS else "bgr24"
         self._log = log or _log
         self._ffmpeg_usage = ffmpeg_usage
+        self._threads = threads
+        self._decimate = max(Fraction(1), _ratio(decimate or 1))
         self._force = bool(force_ffmpeg)
+        self._pipe_scale = bool(pipe_scale)
         self._force_size = force_size
         self._hwaccel = hwaccel
         self._decode_args = tuple(decode_args) if decode_args else None
         self._cv2 = None
         self._proc = None
+        self._pending = None
+        self._seek_keyframe = False
+        # 上次成功启动所用解码后端（备用管道沿用），None 为软件解码
+        self._backend = None
+        self._standby = None
         self._frame_bytes = 0
         self._pipe_w = self._pipe_h = 0
         self._scale_w = 0
         self._scale_h = 0
         self.width = self.height = 0
+        self.src_width = self.src_height = 0
         self.fps = 0.0
         self.frame_count = 0
         self.duration = 0.0
+        self._pos = max(0, int(start or 0))
+        self._seek_keyframe = bool(start_keyframe) and self._pos > 0
+        self._released = False
+        # interrupt 置位后 read/grab 一律返回 False，直到 seek
+        self._interrupted = False
+        self._ring = max(0, int(ring or 0))
+        self._ring_bufs = []
+        self._ring_shape = None
+        self._ring_next = 0
+        self._scratch = None
+        # info：ffmpeg 管道路径的探测结果（MediaInfo），cv2 路径为 None
+        self.info = metadata if isinstance(metadata, MediaInfo) else None
         if metadata is not None:
-            self.width, self.height, self.fps, self.frame_count = metadata
+            self.width, self.height, self.fps, self.frame_count = tuple(metadata)[:4]
+            self.src_width, self.src_height = self.width, self.height
+            if self.info is not None:
+                self.duration = self.info.duration
             if self._force_size is not None:
                 tw, th = self._force_size
                 if tw > 0 and th > 0:
                     self.width, self.height = tw, th
                     self._scale_w, self._scale_h = tw, th
-            self._launch_ffmpeg()
+            if self._force:
+                self._log_force_backend()
+            self._launch_ffmpeg(self._pos / max(self.fps, 1.0))
         else:
             self._open()
 
     def _open(self):
-        # 尝试用 cv2 打开
-        if not self._force:
+        # 尝试用 cv2 打开（管道缩放模式且有随包 ffmpeg 时直接走管道）
+        if not self._force and not (self._pipe_scale and _ffmpeg_exe()):
             cap = cv2.VideoCapture(self.path)
             if cap.isOpened():
                 w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -83,11 +563,12 @@ class FrameReader:
                 ret, _ = cap.read()
                 if w > 0 and h > 0 and ret:
                     try:
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, self._pos)
                     except Exception:
                         pass
                     self._cv2 = cap
                     self.width, self.height = w, h
+                    self.src_width, self.src_height = w, h
                     self.fps, self.frame_count = fps, n
                     self.duration = (n / fps) if fps else 0.0
                     return
@@ -101,11 +582,18 @@ class FrameReader:
             raise RuntimeError(
                 "无法初始化 cv2 视频解码器，且未找到随包 ffmpeg，无法解码该视频。"
             )
-        w, h, fps, n, dur = self._probe_with_ffmpeg(ff)
+        info = probe_media(self.path, self._log)
+        if info is not None:
+            self.info = info
+            w, h, fps, n, dur = info.width, info.height, info.fps, info.frame_count, info.duration
+        else:
+            # cv2 元信息不含音频等字段，不作为 self.info
+            w, h, fps, n, dur = tuple(probe_cv2(self.path) or (0, 0, 0.0, 0, 0.0))[:5]
         if w <= 0 or h <= 0:
             raise RuntimeError(
                 f"无法初始化视频解码器：无法探测视频分辨率（{self.path}）"
             )
+        self.src_width, self.src_height = w, h
         scale_w = scale_h = 0
         if self._force_size is not None:
             tw, th = self._force_size
@@ -117,21 +605,19 @@ class FrameReader:
         self.duration = dur or (n / fps if fps else 0.0)
 
         if self._force:
-            if self._decode_args:
-                self._log(f"导出解码：使用指定后端 {self._decode_args[-1]}")
-            else:
-                hw = _probe_hw_accel() if self._hwaccel else {"decode": []}
-                if hw["decode"]:
-                    backends = [d[-1] for d in hw["decode"]]
-                    self._log(f"导出解码：使用随包 ffmpeg + 硬件加速 {', '.join(backends)}")
-                else:
-                    self._log("导出解码：使用随包 ffmpeg 软件解码")
+            self._log_force_backend()
+        elif self._pipe_scale:
+            # 尺寸待 set_output_size 指定，首次读帧时再启动
+            self._log("播放解码：随包 ffmpeg 管道按字符网格缩放输出")
+            return
         else:
             self._log("解码回退：cv2 无法打开该视频，改用随包 ffmpeg 管道解码")
-        self._launch_ffmpeg()
+        self._launch_ffmpeg(self._pos / max(self.fps, 1.0))
 
     def _launch_ffmpeg(self, seek_seconds=0):
-        # 启动 ffmpeg 解码管道
+        # 启动 ffmpeg 解码管道：读到首个完整帧即就绪（暂存供下次 read 返回），
+        # 进程直接结束视为该后端失败，回退下一项；还有后备项时首帧等待设超时，
+        # 失败的后端本次运行内不再尝试
         ff = _ffmpeg_exe()
         if self._decode_args:
             candidates = [self._decode_args, None]
@@ -140,102 +626,274 @@ class FrameReader:
             candidates = list(hw["decode"]) + [None]
         else:
             candidates = [None]
+        codec = self.info.video_codec if self.info is not None else ""
+        candidates = [d for d in candidates
+                      if d is None or (d[-1], codec) not in _FAILED_BACKENDS]
+        w = self._scale_w if self._scale_w > 0 else self.width
+        h = self._scale_h if self._scale_h > 0 else self.height
+        self._pipe_w, self._pipe_h = w, h
+        self._frame_bytes = w * h * PIX_FMTS[self.pix_fmt]
+        # 关键帧跳转只作用于本次启动（之后按尺寸/格式重启时位置不一定是关键帧）
+        seek_args = self._seek_args(seek_seconds, self._seek_keyframe)
+        self._seek_keyframe = False
 
         used = None
-        for decode_args in candidates:
-            cmd = [ff, "-nostdin", "-loglevel", "warning",
-                   "-threads", str(_decode_threads(self._ffmpeg_usage))]
-            if decode_args:
-                cmd += list(decode_args)
-            if seek_seconds > 0:
-                cmd += ["-ss", f"{seek_seconds:.3f}"]
-            cmd += ["-i", self.path] + _fps_flag()
-            if self._scale_w > 0 and self._scale_h > 0:
-                cmd += ["-vf", f"scale={self._scale_w}:{self._scale_h}"]
-            cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "-"]
-            kwargs = {"stdout": subprocess.PIPE, "stderr": subprocess.PIPE,
-                      "creationflags": _CREATE_NO_WINDOW}
-            self._proc = subprocess.Popen(cmd, **kwargs)
-            _forward_stderr(self._proc, self._log)
-            time.sleep(0.2)
-            if self._proc.poll() is None:
+        for i, decode_args in enumerate(candidates):
+            last = i == len(candidates) - 1
+            self._proc = self._spawn(ff, decode_args, seek_args, self._pos)
+            if not self._interrupted and self._first_frame(None if last else _HW_LAUNCH_TIMEOUT):
                 used = decode_args
                 break
-            self._proc.terminate()
+            if self._interrupted:
+                # 被 interrupt 打断：不再尝试后续后端，read 随即返回 False
+                _stop_proc(self._proc)
+                self._proc = None
+                return
+            if last and self._proc.wait() == 0:
+                # 软件解码正常结束却无帧（如跳到片尾之后）：视为流已结束
+                break
+            # 超时或报错退出记为该后端不可用；正常结束无帧（跳到片尾之后）不算
+            try:
+                rc = self._proc.wait(timeout=0.5)
+            except subprocess.TimeoutExpired:
+                rc = None
+            # 超时的读首帧线程随进程结束读到 EOF 退出
+            _stop_proc(self._proc)
             if decode_args:
+                if rc != 0:
+                    _FAILED_BACKENDS.add((decode_args[-1], codec))
                 self._log(f"解码加速 {decode_args[-1]} 不可用，回退下一项…")
         else:
-            self._proc = None
             raise RuntimeError("所有解码后端均不可用，无法启动视频解码管道。")
 
+        self._backend = used
         if used:
             self._log(f"解码加速：已启用 {used[-1]}")
         else:
             self._log("已回退到软件解码")
-        w = self._scale_w if self._scale_w > 0 else self.width
-        h = self._scale_h if self._scale_h > 0 else self.height
-        self._pipe_w, self._pipe_h = w, h
-        self._frame_bytes = w * h * 3
 
-    def _probe_with_ffmpeg(self, ff):
-        # ffmpeg 探测视频元信息
-        try:
-            res = subprocess.run(
-                [ff, "-hide_banner", "-i", self.path],
-                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
-                text=True,
-                creationflags=_CREATE_NO_WINDOW,
-            )
-            txt = res.stderr or ""
-        except Exception:
-            txt = ""
+    def _spawn(self, ff, decode_args, seek_args, first=0):
+        # 按当前输出尺寸/像素格式启动一个 ffmpeg 解码进程（first：首个解码帧的源帧号，供抽帧滤镜对齐）
+        cmd = [ff, "-nostdin", "-loglevel", "warning",
+               "-threads", str(self._threads or _decode_threads(self._ffmpeg_usage))]
+        if decode_args:
+            cmd += list(decode_args)
+        cmd += seek_args
+        cmd += ["-i", self.path] + _fps_flag()
+        filters = []
+        if self._decimate > 1:
+            filters.append(_select_filter(first, self._decimate))
+        if self._scale_w > 0 and self._scale_h > 0:
+            filters.append(f"scale={self._scale_w}:{self._scale_h}")
+        if filters:
+            cmd += ["-vf", ",".join(filters)]
+        cmd += ["-f", "rawvideo", "-pix_fmt", self.pix_fmt, "-"]
+        kwargs = {"stdout": subprocess.PIPE, "stderr": subprocess.PIPE,
+                  "creationflags": _CREATE_NO_WINDOW}
+        proc = subprocess.Popen(cmd, **kwargs)
+        _forward_stderr(proc, self._log)
+        return proc
 
-        if txt:
-            w = h = 0
-        m = re.search(r"Stream.*?Video.*?(\d{2,})x(\d{2,})", txt)
-        if m:
-            w, h = int(m.group(1)), int(m.group(2))
-
-        fps = 0.0
-        mf = re.search(r"(\d+(?:\.\d+)?)\s*fps", txt)
-        if mf:
-            fps = clean_fps(float(mf.group(1)))
-
-        n = 0
-        dur = 0.0
-        mn = re.search(r"nb_frames\s*=\s*(\d+)", txt)
-        if mn:
-            n = int(mn.group(1))
-        md = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", txt)
-        if md:
-            dur = int(md.group(1)) * 3600 + int(md.group(2)) * 60 + float(md.group(3))
-            if not n and fps:
-                n = int(dur * fps)
+    def _first_frame(self, timeout):
+        # 读首帧到该候选独用的暂存缓冲；超时或进程无帧结束返回 False
+        # 不用环形槽位：超时后读线程仍可能写入，不能与下一候选或后续帧共用
+        buf = np.empty(self._pipe_shape(), dtype=np.uint8)
+        result = []
+        if timeout is None:
+            result.append(self._read_into(buf))
+        else:
+            t = threading.Thread(target=lambda: result.append(self._read_into(buf)),
+                                 daemon=True)
+            t.start()
+            t.join(timeout)
+            if t.is_alive():
+                self._log(f"解码管道 {timeout:.0f}s 内未输出首帧")
+                return False
+        if result and result[0]:
+            self._pending = buf
+            return True
+        return False
 
-        if w <= 0 or h <= 0:
-            cap = cv2.VideoCapture(self.path)
-            if cap.isOpened():
-                w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or w
-                h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or h
-                fps = clean_fps(cap.get(cv2.CAP_PROP_FPS)) or fps
-                n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or n
-            cap.release()
+    def _log_force_backend(self):
+        # 记录强制 ffmpeg 解码（导出）所用后端
+        if self._decode_args:
+            self._log(f"导出解码：使用指定后端 {self._decode_args[-1]}")
+            return
+        hw = _probe_hw_accel() if self._hwaccel else {"decode": []}
+        if hw["decode"]:
+            backends = [d[-1] for d in hw["decode"]]
+            self._log(f"导出解码：使用随包 ffmpeg + 硬件加速 {', '.join(backends)}")
+        else:
+            self._log("导出解码：使用随包 ffmpeg 软件解码")
+
+    def _ensure_pipe(self):
+        # 管道缩放模式下按需（重新）启动管道，从当前帧位置继续
+        if self._proc is None and self._pipe_scale and self._cv2 is None and not self._released:
+            self._launch_ffmpeg(self._pos / max(self.fps, 1.0))
+
+    def preroll(self):
+        # 管道缩放模式下立即启动解码管道并读好首帧（默认首次读帧时才启动），用于预热下一个视频
+        self._ensure_pipe()
+        return self._proc is not None or self._cv2 is not None
+
+    def _seek_args(self, seek_seconds, keyframe=False):
+        # 输入端跳转参数：关键帧跳转关闭精确跳转，并把时刻推后半帧，
+        # 避免时间戳舍入落到关键帧之前而退回上一个关键帧
+        if seek_seconds <= 0:
+            return []
+        if keyframe:
+            half = 0.5 / max(self.fps, 1.0)
+            return ["-noaccurate_seek", "-ss", f"{seek_seconds + half:.6f}"]
+        return ["-ss", f"{seek_seconds:.6f}"]
+
+    def _slot(self, shape):
+        # 环形缓冲中下一个可写槽位（帧形状/像素格式变化时整组重新分配）
+        if self._ring_shape != shape:
+            self._ring_bufs = [np.empty(shape, dtype=np.uint8) for _ in range(self._ring)]
+            self._ring_shape = shape
+            self._ring_next = 0
+        return self._ring_bufs[self._ring_next]
+
+    def _advance(self):
+        # 当前槽位交给调用方，下次写入下一个槽位
+        self._ring_next = (self._ring_next + 1) % self._ring
+
+    def _pipe_shape(self):
+        # 管道输出帧形状
+        if self.pix_fmt == "gray":
+            return (self._pipe_h, self._pipe_w)
+        return (self._pipe_h, self._pipe_w, 3)
+
+    def _read_into(self, buf, proc=None):
+        # 从管道读满一帧到 buf（readinto，不产生中间 bytes）
+        stdout = (proc or self._proc).stdout
+        view = memoryview(buf).cast("B")
+        got = 0
+        while got < len(view):
+            n = stdout.readinto(view[got:])
+            if not n:
+                return False
+            got += n
+        return True
+
+    def _read_cv2_ring(self):
+        # cv2 解码直接写入槽位；灰度先解到复用的 BGR 暂存区再转换进槽位
+        if self.pix_fmt == "gray":
+            shape = (self.height, self.width)
+            src = self._scratch
+            if src is None or src.shape != shape + (3,):
+                src = self._scratch = np.empty(shape + (3,), dtype=np.uint8)
+            ret, frame = self._cv2.read(image=src)
+            if not ret:
+                return False, None
+            out = self._slot(shape)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out)
+        else:
+            out = self._slot((self.height, self.width, 3))
+            ret, frame = self._cv2.read(image=out)
+            if not ret:
+                return False, None
+        if frame is out:
+            self._advance()
+        return True, frame
 
-        return w, h, fps, n, dur
+    def _skip_unsampled(self):
+        # 抽帧模式：位置推进到下一个抽中的源帧；cv2 逐帧 grab 跳过，管道中的已由滤镜丢弃
+        while not _sampled(self._pos, self._decimate):
+            if self._cv2 is not None and not self._cv2.grab():
+                return False
+            self._pos += 1
+        return True
 
     def read(self):
         # 读取一帧
+        if self._interrupted:
+            return False, None
+        if self._decimate > 1 and not self._skip_unsampled():
+            return False, None
         if self._cv2 is not None:
-            return self._cv2.read()
+            self._pos += 1
+            if self._ring:
+                return self._read_cv2_ring()
+            ret, frame = self._cv2.read()
+            if ret and self.pix_fmt == "gray":
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            return ret, frame
+        self._ensure_pipe()
+        if self._proc is None:
+            return False, None
+        if self._pending is not None:
+            frame, self._pending = self._pending, None
+            self._pos += 1
+            if self._ring:
+                self._advance()
+            return True, frame
+        if self._ring:
+            frame = self._slot(self._pipe_shape())
+            if not self._read_into(frame):
+                return False, None
+            self._pos += 1
+            self._advance()
+            return True, frame
         raw = self._proc.stdout.read(self._frame_bytes)
         if len(raw) < self._frame_bytes:
             return False, None
-        frame = np.frombuffer(raw, dtype=np.uint8).reshape(self._pipe_h, self._pipe_w, 3)
-        return True, frame
+        self._pos += 1
+        return True, np.frombuffer(raw, dtype=np.uint8).reshape(self._pipe_shape())
+
+    def grab(self):
+        # 跳过一帧：cv2 只取帧不做颜色转换/拷贝，管道读出后直接丢弃
+        # 环形模式下读入下一个（已过期的）槽位，不推进
+        if self._interrupted:
+            return False
+        if self._decimate > 1 and not self._skip_unsampled():
+            return False
+        self._pos += 1
+        if self._cv2 is not None:
+            return self._cv2.grab()
+        self._ensure_pipe()
+        if self._proc is None:
+            return False
+        if self._pending is not None:
+            self._pending = None
+            return True
+        if self._ring:
+            return self._read_into(self._slot(self._pipe_shape()))
+        raw = self._proc.stdout.read(self._frame_bytes)
+        return len(raw) == self._frame_bytes
+
+    def set_output_size(self, width, height):
+        # 管道缩放模式：改变输出尺寸，管道在下次读帧时从当前位置按新尺寸重启
+        # cv2 解码无法缩小解码尺寸，仍输出原尺寸，由调用方自行缩放
+        if not self._pipe_scale or self._cv2 is not None:
+            return False
+        width, height = max(2, int(width)), max(2, int(height))
+        if (width, height) == (self._scale_w, self._scale_h):
+            return True
+        self._kill_proc()
+        self._scale_w, self._scale_h = width, height
+        self.width, self.height = width, height
+        return True
+
+    def set_pix_fmt(self, pix_fmt):
+        # 切换输出像素格式：cv2 解码只在 read 中转换；管道缩放模式下管道在下次读帧时
+        # 从当前位置按新格式重启；其余管道启动后格式固定
+        pix_fmt = pix_fmt if pix_fmt in PIX_FMTS else "bgr24"
+        if pix_fmt == self.pix_fmt:
+            return True
+        if self._cv2 is None and not self._pipe_scale:
+            return False
+        self.pix_fmt = pix_fmt
+        if self._cv2 is None:
+            self._kill_proc()
+        return True
 
-    def seek(self, frame_no):
-        # 跳转到指定帧
+    def seek(self, frame_no, keyframe=False):
+        # 跳转到指定帧；keyframe=True 表示调用方确认该帧是关键帧（来自关键帧索引），
+        # 管道直接从该关键帧起解码，省去从前一关键帧解码到目标帧再丢弃的过程
         frame_no = max(0, min(int(frame_no), max(0, self.frame_count - 1)))
+        self._pos = frame_no
+        self._interrupted = False
         if self._cv2 is not None:
             try:
                 self._cv2.set(cv2.CAP_PROP_POS_FRAMES, frame_no)
@@ -243,54 +901,219 @@ class FrameReader:
             except Exception:
                 return False
         self._kill_proc()
-        seek_seconds = frame_no / max(self.fps, 1.0)
-        self._launch_ffmpeg(seek_seconds)
+        if self._adopt_standby(frame_no, keyframe):
+            return True
+        self._seek_keyframe = bool(keyframe)
+        if not self._pipe_scale:
+            self._launch_ffmpeg(frame_no / max(self.fps, 1.0))
         return True
 
-    def _kill_proc(self):
-        # 终止 ffmpeg 子进程
-        if self._proc is None:
+    def interrupt(self):
+        # 供其他线程调用：终止当前解码进程，使阻塞中的 read/grab（含启动管道时等首帧）读到 EOF 尽快返回
+        # 之后 read/grab 一律返回 False，直到 seek；进程的回收留给之后的 seek/release（不动备用管道）
+        self._interrupted = True
+        proc = self._proc
+        if proc is None:
             return
+        proc._stopping = True
         try:
-            self._proc.stdout.close()
-        except Exception:
-            pass
-        try:
-            self._proc.terminate()
+            proc.terminate()
         except Exception:
             pass
+
+    def _standby_key(self, frame_no, keyframe):
+        # 备用管道可换用的条件：位置、跳转方式与当前输出尺寸/像素格式一致
+        return (frame_no, bool(keyframe) and frame_no > 0, self._scale_w, self._scale_h,
+                self.pix_fmt)
+
+    def prepare_standby(self, frame_no, keyframe=False):
+        # 预启动备用解码管道：定位到 frame_no 并在后台读好首帧，
+        # 之后 seek 到同一位置（如循环播放回到片头）时直接换用，省去进程启动与解封装初始化
+        # 仅 ffmpeg 管道解码有效；尺寸/像素格式变化后备用管道作废
+        if self._cv2 is not None or self._released:
+            return False
+        ff = _ffmpeg_exe()
+        if not ff:
+            return False
+        frame_no = max(0, min(int(frame_no), max(0, self.frame_count - 1)))
+        self.drop_standby()
+        # 播放时由主线程调用，解码线程可能同时改输出尺寸/像素格式：
+        # 键与帧形状取自同一快照，启动后若已变化则作废，避免键与进程实际输出不符而被换用
+        key = self._standby_key(frame_no, keyframe)
+        _, _, sw, sh, pix_fmt = key
+        w = sw if sw > 0 else self.width
+        h = sh if sh > 0 else self.height
+        shape = (h, w) if pix_fmt == "gray" else (h, w, 3)
+        seek_args = self._seek_args(frame_no / max(self.fps, 1.0), keyframe)
         try:
-            self._proc.wait(timeout=2)
-        except Exception:
-            try:
-                self._proc.kill()
-            except Exception:
-                pass
+            proc = self._spawn(ff, self._backend, seek_args, frame_no)
+        except Exception as e:
+            self._log(f"备用解码管道启动失败: {e}")
+            return False
+        if self._standby_key(frame_no, keyframe) != key:
+            _stop_proc(proc, wait=False)
+            return False
+        self._standby = _Standby(key, proc, shape, self)
+        return True
+
+    def drop_standby(self):
+        # 关闭备用管道
+        standby, self._standby = self._standby, None
+        if standby is not None:
+            standby.close()
+
+    def _adopt_standby(self, frame_no, keyframe):
+        # 换用位置匹配的备用管道（首帧未读完则等它读完）；不匹配或失败时关闭并返回 False
+        standby, self._standby = self._standby, None
+        if standby is None:
+            return False
+        if standby.key != self._standby_key(frame_no, keyframe) or not standby.wait():
+            standby.close()
+            return False
+        self._proc = standby.proc
+        self._pending = standby.frame
+        h, w = standby.frame.shape[:2]
+        self._pipe_w, self._pipe_h = w, h
+        self._frame_bytes = standby.frame.nbytes
+        self._seek_keyframe = False
+        return True
+
+    def _frame(self, image):
+        # 刚读出的帧包装为 Frame
+        n = self._pos - 1
+        return Frame(n, n / self.fps if self.fps > 0 else 0.0, image)
+
+    def __iter__(self):
+        # 在调用线程逐帧读取 Frame（无预读；环形模式下帧的有效期同 read）
+        while True:
+            ret, image = self.read()
+            if not ret:
+                return
+            yield self._frame(image)
+
+    def stream(self, prefetch=4):
+        # 后台线程预读 prefetch 帧的 FrameStream（支持 for 与 async for）
+        return FrameStream(self, prefetch)
+
+    def _kill_proc(self):
+        # 终止 ffmpeg 子进程（连同暂存的首帧）
+        self._pending = None
+        if self._proc is None:
+            return
+        _stop_proc(self._proc, wait=False)
         self._proc = None
 
     def release(self):
         # 释放资源
+        self._released = True
+        self._pending = None
         if self._cv2 is not None:
             try:
                 self._cv2.release()
             except Exception:
                 pass
             self._cv2 = None
+        self.drop_standby()
         if self._proc is not None:
-            try:
-                self._proc.stdout.close()
-            except Exception:
-                pass
-            try:
-                self._proc.terminate()
-            except Exception:
-                pass
-            try:
-                self._proc.wait(timeout=2)
-            except Exception:
-                pass
+            _stop_proc(self._proc)
             self._proc = None
 
     @property
     def is_opened(self):
-        return self._cv2 is not None or self._proc is not None
+        return self._cv2 is not None or self._proc is not None or (
+            self._pipe_scale and not self._released)
+
+
+class FrameStream:
+    # FrameReader 的预读迭代器：后台线程提前读出至多 prefetch 帧，for / async for 逐个取出 Frame，
+    # 消费方的循环（渲染、事件循环）不被解码阻塞；读取出错时在取帧处重新抛出
+    # 环形缓冲槽位数不足 prefetch + 2 时逐帧拷贝（队列中、消费方持有、读入中的帧须同时有效）
+    # 预读期间不得再直接调用 reader 的 read/seek 等方法；close 不释放 reader
+
+    def __init__(self, reader, prefetch=4):
+        self.reader = reader
+        depth = max(1, int(prefetch))
+        self._copy = 0 < reader._ring < depth + 2
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._error = None
+        self._done = False
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # 入队（队满时等待，关闭后放弃）
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        # 预读线程：读到流尾或出错时入队 None
+        try:
+            while not self._stop.is_set():
+                ret, image = self.reader.read()
+                if not ret:
+                    break
+                if self._copy:
+                    image = image.copy()
+                if not self._put(self.reader._frame(image)):
+                    return
+        except Exception as e:
+            self._error = e
+        self._put(None)
+
+    def _unwrap(self, item):
+        # 队列项转为返回值：None 表示结束（出错则抛出）
+        if item is None:
+            self._done = True
+            if self._error is not None:
+                raise self._error
+            return None
+        return item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        item = self._unwrap(self._queue.get())
+        if item is None:
+            raise StopIteration
+        return item
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # 队列有帧时直接返回，否则在默认线程池中等待，不阻塞事件循环
+        if self._done:
+            raise StopAsyncIteration
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            import asyncio
+            item = await asyncio.get_running_loop().run_in_executor(None, self._queue.get)
+        item = self._unwrap(item)
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        # 停止预读线程并丢弃已预读的帧；唤醒仍在等待的取帧方
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join(timeout=5)
+        self._done = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
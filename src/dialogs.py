@@ -1,5 +1,6 @@
 # 视频文件选择
 import os
+import re
 import sys
 
 from textual.app import ComposeResult
@@ -34,6 +35,40 @@ def _gui_available():
 
 _VIDEO_EXTS = [".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv", ".webm",
                ".m4v", ".mpg", ".mpeg", ".ts", ".m2ts", ".vob"]
+_PLAYLIST_EXTS = [".txt", ".m3u", ".m3u8"]
+
+
+def _natural_key(path):
+    # 自然排序键：文件名中的数字按数值比较（第2集排在第10集之前）
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", os.path.basename(path))]
+
+
+def expand_playlist(path):
+    # 播放路径展开为视频列表：文件夹（其中的视频文件）、通配符（匹配的文件）、
+    # 播放列表文本（每行一个路径，# 开头为注释，相对路径相对列表所在目录）或单个视频
+    path = os.path.expanduser((path or "").strip().strip('"'))
+    if not path:
+        return []
+    if os.path.isdir(path):
+        items = [os.path.join(path, f) for f in os.listdir(path)
+                 if os.path.splitext(f)[1].lower() in _VIDEO_EXTS]
+        return sorted((p for p in items if os.path.isfile(p)), key=_natural_key)
+    if not os.path.exists(path) and any(c in path for c in "*?["):
+        import glob
+        return sorted((p for p in glob.glob(path) if os.path.isfile(p)), key=_natural_key)
+    if os.path.splitext(path)[1].lower() in _PLAYLIST_EXTS and os.path.isfile(path):
+        base = os.path.dirname(os.path.abspath(path))
+        items = []
+        try:
+            with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+                for line in f:
+                    line = line.strip().strip('"')
+                    if line and not line.startswith("#"):
+                        items.append(os.path.join(base, os.path.expanduser(line)))
+        except Exception as e:
+            _log_error(f"读取播放列表失败: {e}")
+        return items
+    return [path]
 
 
 # 复用的 Tk 根窗口（避免反复初始化 Tcl/Tk）
@@ -113,7 +148,8 @@ def _run_dialog(mode, initial=None, def_ext=None, default_dir=None):
             )
         else:
             ext_pat = " ".join("*" + e for e in _VIDEO_EXTS)
-            filetypes = [("视频文件", ext_pat), ("所有文件", "*.*")]
+            list_pat = " ".join("*" + e for e in _PLAYLIST_EXTS)
+            filetypes = [("视频文件", ext_pat), ("播放列表", list_pat), ("所有文件", "*.*")]
             path = filedialog.askopenfilename(
                 title="请选择视频",
                 initialdir=initialdir or os.getcwd(),
@@ -171,7 +207,7 @@ class SelectingScreen(Screen):
         if self._use_text:
             yield Static("当前环境无图形文件对话框，请直接输入视频路径：", id="msg")
             yield Input(value=self._initial or "", id="path",
-                        placeholder="输入视频路径后回车，Esc 取消")
+                        placeholder="输入视频路径后回车（播放时也可输入文件夹、通配符或播放列表），Esc 取消")
         else:
             yield Static("请选择视频…", id="msg")
 
@@ -6,23 +6,24 @@ import tempfile
 import threading
 import time
 
-import re
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
-from ascii_art import ASCII_CHARS, make_lookup
-from decoder import FrameReader
+from ascii_art import (
+    current_charset, current_tone, make_index_lookup, AutoLevels, load_auto_levels,
+    _read_config,
+)
+from decoder import (
+    FrameReader, probe_media, probe_cv2, keyframe_times, keyframe_seek_frame, sample_interval,
+)
 from utils import (
     clean_fps,
     _forward_stderr, _ffmpeg_exe,
     _probe_hw_accel, _CREATE_NO_WINDOW, _log,
-    _set_ffmpeg_max_usage, _encode_threads,
+    _set_ffmpeg_max_usage, _encode_threads, _decode_threads,
 )
 
-# 灰度->字符查找表（复用）
-_GRAY_LOOKUP = make_lookup(ASCII_CHARS)
-
 # 容器格式 -> ffmpeg 视频编码器候选（按顺序尝试）
 _FMT_FFMPEG_CODECS = {
     "mp4":  [("libx264", ["-pix_fmt", "yuv420p"])],
@@ -44,6 +45,13 @@ _ENCODER_MAX_SIZE = {
 _MAX_CANVAS_W = 8192
 _MAX_CANVAS_H = 8192
 
+# 单进程导出的预读帧数（解码与渲染重叠）
+_EXPORT_PREFETCH = 4
+
+# 分段并行解码：已解码未消费帧的内存上限（字节）与每段最短时长（秒）
+_SEGMENT_MEMORY = 512 * 1024 * 1024
+_SEGMENT_MIN_SECONDS = 2.0
+
 
 class _FFmpegWriter:
     # ffmpeg 子进程视频写出器
@@ -110,11 +118,14 @@ class QueuedWriter:
         return self._writer.codec
 
     def release(self):
-        # 停止编码线程并等待（非阻塞入队，避免卡住）
-        try:
-            self._queue.put_nowait(None)
-        except Exception:
-            pass
+        # 停止编码线程并等待：队列满时等编码线程腾出位置再放结束标记（丢掉它线程会一直等到 join 超时），
+        # 编码线程已退出则不再等，避免卡住
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.5)
+                break
+            except Exception:
+                pass
         self._thread.join(timeout=60)
         if self._error:
             raise self._error
@@ -253,17 +264,20 @@ def _build_glyph_atlas(font, cell_w, cell_h, chars):
     return atlas, tile_w, tile_h, char_to_idx
 
 
-def _render_frame(char_grid, color_grid, atlas, tile_w, tile_h, char_to_idx, use_color,
+def _atlas_lookup(chars, char_to_idx, tone=None):
+    # 256 级灰度 -> 图集索引查找表（字形索引表与色调曲线合成，逐帧只查一次表）
+    space_idx = char_to_idx.get(" ", 0)
+    glyph_to_atlas = np.array([char_to_idx.get(ch, space_idx) for ch in chars] or [space_idx],
+                              dtype=np.intp)
+    return glyph_to_atlas[make_index_lookup(chars, tone)]
+
+
+def _render_frame(idx_grid, color_grid, atlas, tile_w, tile_h, use_color,
                  canvas_w, canvas_h):
-    # numpy 渲染一帧为 BGR
-    h, w = char_grid.shape
+    # numpy 渲染一帧为 BGR（idx_grid 为图集索引网格）
+    h, w = idx_grid.shape
     H, W = h * tile_h, w * tile_w
-    space_idx = char_to_idx.get(" ", 0)
-    def _lookup(ch):
-        return char_to_idx.get(ch, space_idx)
-    idx = np.frompyfunc(_lookup, 1, 1)(char_grid.ravel())
-    idx = np.asarray(idx, dtype=np.intp).reshape(h, w)
-    luma = atlas[idx]
+    luma = atlas[idx_grid]
     luma = luma.swapaxes(1, 2).reshape(H, W)
 
     if use_color and color_grid is not None:
@@ -284,31 +298,35 @@ def _render_frame(char_grid, color_grid, atlas, tile_w, tile_h, char_to_idx, use
     return cur
 
 
-def _small(frame, target_w, target_h):
-    # 缩放到目标字符网格尺寸
+def _small(frame, target_w, target_h, use_color=True):
+    # 缩放到目标字符网格尺寸 -> (RGB 或 None, 灰度)
+    # 单通道帧（灰度管道）直接作灰度；灰度导出不做 RGB 转换
     if frame.shape[1] == target_w and frame.shape[0] == target_h:
         resized = frame
     else:
         resized = cv2.resize(frame, (target_w, target_h), interpolation=cv2.INTER_AREA)
+    if resized.ndim == 2:
+        return None, resized
     gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
-    rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB) if use_color else None
     return rgb, gray
 
 
-def _grids_from_rgb(rgb, use_color, gray=None):
-    # RGB -> 字符网格与颜色网格
+def _grids_from_rgb(rgb, use_color, glyph_lut, gray=None):
+    # RGB -> 图集索引网格与颜色网格（glyph_lut 见 _atlas_lookup）
     lum = gray if gray is not None else cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
-    char_grid = _GRAY_LOOKUP[lum]
+    idx_grid = glyph_lut[lum]
     color_grid = rgb if use_color else None
-    return char_grid, color_grid
+    return idx_grid, color_grid
 
 
 # --------------------------- 主导出入口 ---------------------------
 def export_video(video_path, output_path, target_w, target_h, target_fps,
                  use_color=False, fmt="mp4", on_progress=None, on_done=None,
-                 on_log=None, hwaccel=True, ffmpeg_usage=None, cancel=None):
+                 on_log=None, hwaccel=True, ffmpeg_usage=None, cancel=None, parallel=None):
     # 单遍导出：边解码边按目标帧率抽样、逐帧渲染编码
     # cancel: 无参可调用，返回 True 时中断并清理进程
+    # parallel: None 按 setting.json 的 ParallelExport（默认开）与解码线程预算自动分段并行解码，False 强制单进程
     decode_args = None
     if isinstance(hwaccel, dict):
         decode_args = hwaccel.get("decode_args")
@@ -317,29 +335,35 @@ def export_video(video_path, output_path, target_w, target_h, target_fps,
         _set_ffmpeg_max_usage(ffmpeg_usage)
     log = _make_log(on_log)
     log(f"开始导出: 输入={video_path} -> 输出={output_path} (格式 {fmt}, 彩色={use_color})")
-    try:
-        cap = FrameReader(video_path, log=log, force_ffmpeg=True, hwaccel=hwaccel,
-                          decode_args=decode_args)
-    except Exception as e:
-        msg = f"错误：无法打开视频（{e}）"
+    # ffmpeg 描述不出视频流时退回 cv2 读元信息（与 FrameReader 打开时的回退一致）
+    info = probe_media(video_path, log) or probe_cv2(video_path)
+    if info is None:
+        msg = f"错误：无法打开视频（无法探测视频流：{video_path}）"
         if on_done:
             on_done(False, msg)
         return False, msg
-    src_fps = clean_fps(cap.fps)
-    src_w = int(cap.width)
-    src_h = int(cap.height)
-    src_count = int(cap.frame_count)
-    cap.release()
+    src_fps = clean_fps(info.fps)
+    src_w = int(info.width)
+    src_h = int(info.height)
+    # 帧数是时长 × 帧率的估算：只用于进度与分段规划，末段读到流尾，不以它截断输出
+    src_count = int(info.frame_count)
     log(f"源视频: {src_w}x{src_h} @ {src_fps:.2f}fps -> 目标 {target_w}x{target_h} @ {target_fps:.2f}fps")
 
     target_w = max(1, min(int(target_w), src_w))
     target_h = max(1, min(int(target_h), src_h))
     target_fps = max(1.0, min(float(target_fps), src_fps))
-    interval = max(1.0, src_fps / max(0.1, target_fps))
+    interval = sample_interval(src_fps, target_fps)
     est_total = max(1, int(round(src_count / interval))) if src_count > 0 else None
 
-    font, cell_w, cell_h = _load_mono_font(ASCII_CHARS)
-    atlas, tile_w, tile_h, char_to_idx = _build_glyph_atlas(font, cell_w, cell_h, ASCII_CHARS)
+    chars = current_charset()
+    font, cell_w, cell_h = _load_mono_font(chars)
+    atlas, tile_w, tile_h, char_to_idx = _build_glyph_atlas(font, cell_w, cell_h, chars)
+    tone = current_tone()
+    # 自动电平：传未含色调的基础表，逐帧与自动色调曲线合成
+    auto_levels = AutoLevels(tone) if load_auto_levels() else None
+    glyph_lut = _atlas_lookup(chars, char_to_idx, None if auto_levels else tone)
+    if auto_levels is not None:
+        log("色调: 自动电平")
     canvas_w = target_w * tile_w
     canvas_h = target_h * tile_h
     canvas_w += canvas_w % 2
@@ -355,7 +379,7 @@ def export_video(video_path, output_path, target_w, target_h, target_fps,
             on_done(False, msg)
         return False, msg
 
-    metadata = (src_w, src_h, src_fps, src_count)
+    metadata = info._replace(fps=src_fps)
     t0 = time.time()
 
     if decode_args:
@@ -372,12 +396,25 @@ def export_video(video_path, output_path, target_w, target_h, target_fps,
         return _finish_export(False, msg, on_done)
     writer = QueuedWriter(writer)
     log(f"导出开始: 画布 {canvas_w}x{canvas_h} @ {target_fps:.2f}fps, 格式 {fmt}, 编码器 {writer.codec}, 彩色={use_color}")
+    # 解码线程预算够开多个进程时按关键帧分段并行解码（parallel=False 或配置关闭时单进程）
+    # 分段起点只取可干净起解的关键帧（开放 GOP 的关键帧不在索引中）
+    segments = None
+    workers = _decode_threads(ffmpeg_usage)
+    if parallel is None:
+        parallel = bool(_read_config().get("ParallelExport", True))
+    if parallel is not False and workers >= 2 and src_count > 0:
+        frame_bytes = target_w * target_h * (3 if use_color else 1)
+        segments = _segment_bounds(video_path, src_fps, src_count, workers, frame_bytes,
+                                   interval, log)
+        if segments:
+            workers = min(workers, len(segments))
     ok, msg = _export_single(
         video_path, writer, output_path, target_w, target_h, target_fps, use_color,
         canvas_w, canvas_h, interval, est_total, on_progress, log,
         metadata=metadata, hwaccel=hwaccel, decode_args=decode_args,
         atlas=atlas, tile_w=tile_w, tile_h=tile_h,
-        char_to_idx=char_to_idx, ffmpeg_usage=ffmpeg_usage, cancel=cancel)
+        glyph_lut=glyph_lut, auto_levels=auto_levels, ffmpeg_usage=ffmpeg_usage, cancel=cancel,
+        segments=segments, workers=workers)
     writer.release()
     if ok:
         _mux_audio(output_path, video_path, fmt, log)
@@ -405,20 +442,9 @@ def _finish_export(ok, msg, on_done, elapsed=None):
 
 
 def _source_has_audio(video_path, log):
-    # 检查原视频是否含音频流
-    ff = _ffmpeg_exe()
-    if not ff:
-        return False
-    try:
-        res = subprocess.run(
-            [ff, "-hide_banner", "-i", video_path],
-            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
-            creationflags=_CREATE_NO_WINDOW,
-        )
-        txt = res.stderr or ""
-    except Exception:
-        return False
-    return bool(re.search(r"Stream.*Audio", txt))
+    # 检查原视频是否含音频流（探测结果有缓存）
+    info = probe_media(video_path, log)
+    return bool(info and info.has_audio)
 
 
 def _mux_audio(output_video_path, source_video_path, fmt, log):
@@ -475,39 +501,176 @@ def _mux_audio(output_video_path, source_video_path, fmt, log):
 
 
 # --------------------------- 单线程导出 ---------------------------
+def _sampled_count(start, end, interval):
+    # 源帧 [start, end) 中按抽帧间隔（Fraction p/q）抽中的帧数（与 decoder._sampled 一致）
+    p, q = interval.numerator, interval.denominator
+    return end * q // p - start * q // p
+
+
+def _segment_bounds(video_path, fps, frame_count, workers, frame_bytes, interval, log):
+    # 关键帧对齐的分段 [(起始帧, 结束帧)]，末段结束帧为 None（读到流尾）
+    # 无关键帧索引、首帧时间戳不在 0 附近、非恒定帧率或段首跳转不准时返回 None（退回单进程解码）
+    times = keyframe_times(video_path, log)
+    if not times or len(times) < 2 or times[0] > 0.5 / fps:
+        return None
+    frames = []
+    for t in times:
+        f = t * fps
+        if abs(f - round(f)) > 0.1:
+            return None
+        frames.append(int(round(f)))
+    # 段长：每个解码进程约 4 段以均衡负载，受内存上限约束（只缓存抽中的帧）
+    budget = _SEGMENT_MEMORY // max(1, (workers + 1) * frame_bytes) * interval
+    target = max(_SEGMENT_MIN_SECONDS * fps, min(frame_count / (workers * 4), budget))
+    bounds = []
+    last = 0
+    for f in frames[1:]:
+        if f - last >= target and f < frame_count:
+            bounds.append((last, f))
+            last = f
+    bounds.append((last, None))
+    if len(bounds) < 2:
+        return None
+    # 拼接前核对每段起点：关键帧跳转须正好落在该关键帧，否则段首会多出（或缺少）帧
+    for start, _end in bounds[1:]:
+        landed = keyframe_seek_frame(video_path, start, fps)
+        if landed != start:
+            log(f"分段起点 {start} 帧的关键帧跳转落在 {landed} 帧，退回单进程解码")
+            return None
+    return bounds
+
+
+class _SegmentedFrames:
+    # 分段并行解码：workers 个线程各用独立 FrameReader（从段首关键帧起解码）轮流领取分段，
+    # 按段序合并输出抽中的帧；在途段数限制为 workers + 1，内存随 workers × 段长增长
+
+    def __init__(self, bounds, make_reader, workers, interval, log):
+        # make_reader(start)：返回从 start 帧起按 interval 抽帧的 FrameReader
+        import queue
+        self._bounds = bounds
+        self._make_reader = make_reader
+        self._interval = interval
+        self._log = log
+        self._queues = [queue.Queue() for _ in bounds]
+        self._slots = threading.Semaphore(workers + 1)
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._work, name=f"export-decode-{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def _work(self):
+        # 解码线程：领取下一段（先占在途名额）
+        while not self._stop.is_set():
+            if not self._slots.acquire(timeout=0.1):
+                continue
+            with self._lock:
+                i = self._next
+                self._next += 1
+            if i >= len(self._bounds):
+                self._slots.release()
+                return
+            self._decode(i)
+
+    def _decode(self, i):
+        # 解码第 i 段：抽中的帧入该段队列，结束入 None，出错入异常
+        start, end = self._bounds[i]
+        q = self._queues[i]
+        try:
+            want = None if end is None else _sampled_count(start, end, self._interval)
+            got = 0
+            reader = self._make_reader(start)
+            try:
+                while (want is None or got < want) and not self._stop.is_set():
+                    ret, frame = reader.read()
+                    if not ret:
+                        break
+                    q.put(frame)
+                    got += 1
+            finally:
+                reader.release()
+            if want is not None and got < want and not self._stop.is_set():
+                raise RuntimeError(f"分段 {start}-{end} 只读到 {got}/{want} 帧")
+        except Exception as e:
+            self._log(f"错误：分段解码失败: {e}")
+            q.put(e)
+        q.put(None)
+
+    def __iter__(self):
+        for q in self._queues:
+            while True:
+                item = q.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise RuntimeError(f"分段解码失败（{item}）")
+                yield item
+            self._slots.release()
+
+    def close(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=5)
+
+
 def _export_single(video_path, writer, output_path, target_w, target_h, target_fps, use_color,
                    canvas_w, canvas_h, interval, est_total,
                    on_progress, log, metadata=None, hwaccel=True,
                    decode_args=None,
-                   atlas=None, tile_w=None, tile_h=None, char_to_idx=None,
-                   ffmpeg_usage=None, cancel=None):
-    # 单线程单遍导出；cancel 返回 True 时中断
+                   atlas=None, tile_w=None, tile_h=None, glyph_lut=None, auto_levels=None,
+                   ffmpeg_usage=None, cancel=None, segments=None, workers=1):
+    # 单遍导出：单进程解码，或 segments（_segment_bounds）给定时 workers 个进程分段并行解码；
+    # 渲染与编码仍按帧序单线程进行；cancel 返回 True 时中断
     out_count = 0
     write_err = False
-    src_no = -1
-    _next_out = interval
-
-    cap = FrameReader(video_path, log=log, force_ffmpeg=True, force_size=(target_w, target_h),
-                      metadata=metadata, hwaccel=hwaccel, decode_args=decode_args,
-                      ffmpeg_usage=ffmpeg_usage)
+    decode_err = None
+    lut = glyph_lut if auto_levels is None else glyph_lut[auto_levels.curve]
+    pix_fmt = "bgr24" if use_color else "gray"
+
+    if segments:
+        threads = max(1, _decode_threads(ffmpeg_usage) // workers)
+
+        def _segment_reader(start):
+            # 分段读取器：细节日志只写日志文件，避免每段刷屏
+            return FrameReader(video_path, log=_log, force_ffmpeg=True,
+                               force_size=(target_w, target_h), metadata=metadata,
+                               hwaccel=hwaccel, decode_args=decode_args, pix_fmt=pix_fmt,
+                               threads=threads, start=start, start_keyframe=True,
+                               decimate=interval)
+
+        log(f"分段并行解码: {len(segments)} 段 / {workers} 个解码进程 × {threads} 线程")
+        source = _SegmentedFrames(segments, _segment_reader, workers, interval, log)
+        frames = iter(source)
+    else:
+        source = FrameReader(video_path, log=log, force_ffmpeg=True,
+                             force_size=(target_w, target_h), metadata=metadata,
+                             hwaccel=hwaccel, decode_args=decode_args,
+                             ffmpeg_usage=ffmpeg_usage, pix_fmt=pix_fmt,
+                             ring=_EXPORT_PREFETCH + 2, decimate=interval)
+        source = source.stream(_EXPORT_PREFETCH)
+        frames = (f.image for f in source)
     if on_progress:
         on_progress("render", 0, est_total or 0)
     try:
         while True:
             if cancel and cancel():
                 break
-            ret, frame = cap.read()
-            if not ret:
+            try:
+                frame = next(frames)
+            except StopIteration:
+                break
+            except RuntimeError as e:
+                decode_err = e
                 break
-            src_no += 1
-            if (src_no + 1) < _next_out:
-                continue
-            _next_out += interval
 
-            rgb, gray = _small(frame, target_w, target_h)
-            char_grid, color_grid = _grids_from_rgb(rgb, use_color, gray=gray)
-            cur = _render_frame(char_grid, color_grid, atlas, tile_w, tile_h,
-                                char_to_idx, use_color, canvas_w, canvas_h)
+            rgb, gray = _small(frame, target_w, target_h, use_color)
+            if auto_levels is not None and auto_levels.update(gray):
+                lut = glyph_lut[auto_levels.curve]
+            idx_grid, color_grid = _grids_from_rgb(rgb, use_color, lut, gray=gray)
+            cur = _render_frame(idx_grid, color_grid, atlas, tile_w, tile_h,
+                                use_color, canvas_w, canvas_h)
             try:
                 writer.write(cur)
             except Exception as e:
@@ -518,10 +681,14 @@ def _export_single(video_path, writer, output_path, target_w, target_h, target_f
             if on_progress:
                 on_progress("render", out_count, est_total or out_count)
     finally:
-        cap.release()
+        source.close()
+        if not segments:
+            source.reader.release()
 
     if cancel and cancel():
         return False, "已取消导出"
+    if decode_err is not None:
+        return False, f"错误：{decode_err}"
     if out_count == 0:
         return False, "错误：导出未写入任何帧"
     if write_err:
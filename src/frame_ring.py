@@ -0,0 +1,226 @@
+# 跨进程共享内存帧环
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 槽位状态
+_FREE, _WRITING, _READY, _READING = 0, 1, 2, 3
+# 控制区（int64）：[关闭标志, 保留] + 每槽 [状态, 序号, 高, 宽, 通道, 占用进程 pid]
+_HEAD = 2
+_FIELDS = 6
+_PID = 5
+# 槽位数据按缓存行对齐
+_ALIGN = 64
+# 等待时的轮询间隔（秒），期间检查关闭标志
+_POLL = 0.1
+
+
+def _aligned(n):
+    # 向上对齐到 _ALIGN
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _alive(pid):
+    # 进程是否仍在运行（已退出未回收的僵尸进程算已退出）；无法判断时按存活处理
+    if os.name == "nt":
+        # Windows 上 os.kill 会终止目标进程，改查退出码
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() != 87  # ERROR_INVALID_PARAMETER：无此进程
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            state = f.read().rsplit(b")", 1)[1].split()[0]
+        return state not in (b"Z", b"X")
+    except Exception:
+        return True
+
+
+def _attach(name):
+    # 附加到已有共享内存块，不由附加方登记回收（3.13 起 track=False）；
+    # 更早版本附加方登记到与创建方共用的 resource_tracker（子进程继承），重复登记无害
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class FrameRing:
+    # 固定槽位的共享内存帧环：帧数据与控制区（状态/序号/形状）放在同一块共享内存，
+    # 空闲/就绪计数用进程间信号量，状态变更由一把进程锁保护
+    # 写方 acquire_write 取空闲槽位直接写入（如 FrameReader 帧、渲染画布），publish 后可读；
+    # 读方 acquire_read 取序号最小的就绪槽位，返回的数组直接映射共享内存（零拷贝），用完 release_slot 归还
+    # 多写多读均可；跨进程传递须作为 Process 参数（随进程创建继承信号量与锁）
+    # close 标记流结束并唤醒所有等待方，读方取完剩余帧后得到 None；
+    # 每槽记录占用进程，等待方轮询时发现占槽进程已退出即回收该槽：读方退出只丢该帧，
+    # 写方写到一半退出则同时关闭帧环（流已残缺，读方取完剩余帧后得到 None，不会无限等待）；
+    # 写方在两帧之间退出无从察觉，须由创建方 close 或等待时传 timeout
+    # 创建方 release 时删除共享内存块，创建方崩溃由 resource_tracker 回收
+
+    def __init__(self, slots, slot_bytes, ctx=None):
+        # slots：槽位数；slot_bytes：单帧最大字节数（uint8 帧，形状每槽单独记录）
+        import multiprocessing
+        ctx = ctx or multiprocessing.get_context()
+        self.slots = max(1, int(slots))
+        self.slot_bytes = _aligned(max(1, int(slot_bytes)))
+        self._ctrl_bytes = _aligned((_HEAD + self.slots * _FIELDS) * 8)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self._ctrl_bytes + self.slots * self.slot_bytes)
+        self._owner = True
+        self._lock = ctx.Lock()
+        self._free = ctx.Semaphore(self.slots)
+        self._ready = ctx.Semaphore(0)
+        self._map()
+        self._ctrl[:] = 0
+
+    def __getstate__(self):
+        return {"name": self._shm.name, "slots": self.slots, "slot_bytes": self.slot_bytes,
+                "lock": self._lock, "free": self._free, "ready": self._ready}
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.slot_bytes = state["slot_bytes"]
+        self._ctrl_bytes = _aligned((_HEAD + self.slots * _FIELDS) * 8)
+        self._shm = _attach(state["name"])
+        self._owner = False
+        self._lock = state["lock"]
+        self._free = state["free"]
+        self._ready = state["ready"]
+        self._map()
+
+    def _map(self):
+        # 控制区与数据区的 numpy 视图
+        buf = self._shm.buf
+        self._ctrl = np.ndarray((_HEAD + self.slots * _FIELDS,), dtype=np.int64, buffer=buf)
+        self._meta = self._ctrl[_HEAD:].reshape(self.slots, _FIELDS)
+        self._data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8,
+                                buffer=buf, offset=self._ctrl_bytes)
+
+    @property
+    def closed(self):
+        return bool(self._ctrl[0])
+
+    def _wait(self, sem, timeout):
+        # 等信号量；关闭且计数已取尽时返回 False（读方借此取完剩余帧）
+        # 每个轮询间隔回收已退出进程占用的槽位；传了 timeout 时超时抛 TimeoutError
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+            if sem.acquire(timeout=max(0.0, wait)):
+                return True
+            self._reclaim()
+            if self.closed:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("等待帧环槽位超时")
+
+    def _reclaim(self):
+        # 回收占槽进程已退出的写入中/读取中槽位；写方退出时关闭帧环
+        freed = 0
+        with self._lock:
+            for slot in np.flatnonzero((self._meta[:, 0] == _WRITING) | (self._meta[:, 0] == _READING)):
+                pid = int(self._meta[slot, _PID])
+                if pid <= 0 or _alive(pid):
+                    continue
+                if self._meta[slot, 0] == _WRITING:
+                    self._ctrl[0] = 1
+                self._meta[slot, 0] = _FREE
+                self._meta[slot, _PID] = 0
+                freed += 1
+        for _ in range(freed):
+            self._free.release()
+
+    def _view(self, slot, shape):
+        # 槽位数据按帧形状的视图
+        return self._data[slot, :int(np.prod(shape))].reshape(shape)
+
+    def acquire_write(self, shape, timeout=None):
+        # 取一个空闲槽位，返回 (槽位号, 可直接写入的数组)；帧环已关闭返回 None
+        shape = tuple(int(v) for v in shape)
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError(f"帧 {shape} 超出槽位容量 {self.slot_bytes} 字节")
+        if self.closed or not self._wait(self._free, timeout):
+            return None
+        with self._lock:
+            slot = int(np.flatnonzero(self._meta[:, 0] == _FREE)[0])
+            self._meta[slot, 0] = _WRITING
+            self._meta[slot, _PID] = os.getpid()
+        return slot, self._view(slot, shape)
+
+    def publish(self, slot, seq, shape):
+        # 写完后发布槽位：seq 为帧序号（读方按序号从小到大取）
+        shape = tuple(int(v) for v in shape) + (1,) * (3 - len(shape))
+        with self._lock:
+            self._meta[slot, 1] = seq
+            self._meta[slot, 2:5] = shape[:3]
+            self._meta[slot, 0] = _READY
+            self._meta[slot, _PID] = 0
+        self._ready.release()
+
+    def put(self, seq, frame, timeout=None):
+        # 拷入一帧并发布；帧环已关闭返回 False
+        got = self.acquire_write(frame.shape, timeout)
+        if got is None:
+            return False
+        slot, view = got
+        np.copyto(view, frame)
+        self.publish(slot, seq, frame.shape)
+        return True
+
+    def acquire_read(self, timeout=None):
+        # 取序号最小的就绪槽位，返回 (槽位号, 序号, 帧数组)；帧环已关闭且无剩余帧返回 None
+        # 帧数组映射共享内存，release_slot 之前有效
+        if not self._wait(self._ready, timeout):
+            return None
+        with self._lock:
+            ready = np.flatnonzero(self._meta[:, 0] == _READY)
+            slot = int(ready[np.argmin(self._meta[ready, 1])])
+            self._meta[slot, 0] = _READING
+            self._meta[slot, _PID] = os.getpid()
+            seq, h, w, c = (int(v) for v in self._meta[slot, 1:5])
+        shape = (h, w) if c == 1 else (h, w, c)
+        return slot, seq, self._view(slot, shape)
+
+    def release_slot(self, slot):
+        # 归还读完的槽位
+        with self._lock:
+            self._meta[slot, 0] = _FREE
+            self._meta[slot, _PID] = 0
+        self._free.release()
+
+    def close(self):
+        # 标记流结束：写方不再取得槽位，读方取完剩余帧后得到 None（任一进程均可调用，如取消时）
+        self._ctrl[0] = 1
+
+    def release(self):
+        # 解除本进程映射；创建方同时标记结束并删除共享内存块（其他进程已映射的仍可用到解除为止）
+        if self._owner:
+            self.close()
+        self._ctrl = self._meta = self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # 调用方仍持有帧数组：映射随其回收释放
+            pass
+        if self._owner:
+            self._owner = False
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
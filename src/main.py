@@ -12,7 +12,7 @@ _log(f"==== PyAsciiFilm 启动 ==== | Python {sys.version.split()[0]} | 平台 {
 
 
 def do_play(video_path, use_color, with_audio=True):
-    # 退出 textual 后在原始终端播放
+    # 退出 textual 后在原始终端播放；video_path 可为播放列表（路径列表）
     from playback import play_video
     _log(f"开始播放: {video_path} | 彩色={use_color} 音频={with_audio}")
     try:
@@ -41,7 +41,15 @@ def main():
                 _log("未选择视频，返回菜单")
                 continue
             _log(f"已选择视频: {video_path}")
-            do_play(video_path, use_color=use_color, with_audio=True)
+            # 文件夹/通配符/播放列表展开为多个视频，连续播放不回菜单
+            from dialogs import expand_playlist
+            paths = expand_playlist(video_path)
+            if not paths:
+                _log("播放列表为空，返回菜单")
+                continue
+            if len(paths) > 1:
+                _log(f"播放列表: {len(paths)} 个视频")
+            do_play(paths if len(paths) > 1 else paths[0], use_color=use_color, with_audio=True)
             continue
 
         return
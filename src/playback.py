@@ -2,38 +2,157 @@
 import os
 import sys
 import time
+import queue
 import shutil
+import threading
 import cv2
+import numpy as np
 
 from ascii_art import (
-    generate_grayscale_frame,
-    generate_colored_frame,
+    DeltaRenderer, EncoderRegistry, _read_config,
+    load_render_mode, cell_pixels, halfblock_colors, braille_indices,
+    DEFAULT_TONE, current_tone, set_tone,
+    AutoLevels, load_auto_levels, AUTO_LEVELS_KEY, _write_config_value,
 )
 from audio import start_audio
 
-from decoder import FrameReader
+from decoder import FrameReader, KeyframeIndex
 from utils import _log, _log_error
 
 
 # ---------------------------------------------------------------------------
 # 帧 -> 字符画
 # ---------------------------------------------------------------------------
-def _frame_to_terminal_text(frame, width, use_color):
-    # 帧 -> 终端文本
-    aspect = frame.shape[0] / frame.shape[1]
-    new_height = max(1, int(aspect * width * 0.5))
-    resized_bgr = cv2.resize(frame, (width, new_height))
+def _pixel_size(width, aspect, mode="ascii"):
+    # 字符画宽度 -> 采样像素尺寸 (宽, 高)；行数按源宽高比与字符 1:2 比例计算
+    rows = max(1, int(aspect * width * 0.5))
+    px, py = cell_pixels(mode)
+    return width * px, rows * py
+
+
+def _frame_to_grids(frame, width, use_color, encoder, mode="ascii", levels=None, aspect=None):
+    # 帧 -> (字形索引网格, 前景颜色索引网格或 None, 背景颜色索引网格或 None)
+    # frame 为 BGR 或单通道灰度帧（灰度管道）；彩色模式收到灰度帧时按灰阶颜色处理
+    # levels：AutoLevels，按缩放后的灰度网格更新编码器的 256 项查找表
+    # aspect：源视频高宽比（解码端已缩放的帧不能再用帧自身尺寸推算）
+    if aspect is None:
+        aspect = frame.shape[0] / frame.shape[1]
+    size = _pixel_size(width, aspect, mode)
+    if (frame.shape[1], frame.shape[0]) == size:
+        resized = frame
+    else:
+        resized = cv2.resize(frame, size)
+    single = resized.ndim == 2
+    if mode == "halfblock":
+        # 半块：上下两像素分别作前景/背景色，灰度模式用灰阶颜色
+        if single:
+            pixels = cv2.cvtColor(resized, cv2.COLOR_GRAY2RGB)
+        elif use_color:
+            pixels = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        else:
+            pixels = cv2.cvtColor(cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2RGB)
+        top, bottom = halfblock_colors(encoder.color, pixels)
+        return np.zeros(top.shape, dtype=np.uint8), top, bottom
+    gray = resized if single else cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+    if levels is not None:
+        levels.update(gray)
+        if encoder.tone != levels.tone:
+            encoder.set_tone(levels.tone)
+    if mode == "braille":
+        idx = braille_indices(gray, dot_lut=encoder.dot_lut)
+        if use_color:
+            cells = cv2.resize(resized, (idx.shape[1], idx.shape[0]), interpolation=cv2.INTER_AREA)
+            return idx, encoder.color_indices(_rgb_pixels(cells)), None
+        return idx, None, None
+    idx = encoder.glyph_indices(gray)
     if use_color:
-        pixels = cv2.cvtColor(resized_bgr, cv2.COLOR_BGR2RGB)
-        lum = cv2.cvtColor(resized_bgr, cv2.COLOR_BGR2GRAY)
-        return generate_colored_frame(pixels, lum)
-    gray = cv2.cvtColor(resized_bgr, cv2.COLOR_BGR2GRAY)
-    return generate_grayscale_frame(gray)
+        return idx, encoder.color_indices(_rgb_pixels(resized)), None
+    return idx, None, None
+
+
+def _rgb_pixels(image):
+    # BGR 或单通道图 -> RGB
+    code = cv2.COLOR_GRAY2RGB if image.ndim == 2 else cv2.COLOR_BGR2RGB
+    return cv2.cvtColor(image, code)
+
+
+def _encode_frame(encoder, grids, renderer):
+    # 网格 -> 终端字节：增量渲染器只输出变化区段，否则整屏重绘
+    if renderer is not None:
+        return renderer.render(encoder, *grids)
+    return b"\033[H" + encoder.encode(*grids)
+
+
+def _write_bytes(out, data):
+    # 直接写字节流（无 buffer 的流回退为文本）
+    buf = getattr(out, "buffer", None)
+    if buf is not None:
+        out.flush()
+        buf.write(data)
+    else:
+        out.write(data.decode("utf-8", "replace"))
 
 
 # ---------------------------------------------------------------------------
 # 原始终端播放
 # ---------------------------------------------------------------------------
+# 播放热键
+QUIT_KEYS = ("q", "esc")
+CHARSET_KEY = "c"
+COLOR_KEY = "g"
+TONE_RESET_KEY = "0"
+TONE_INVERT_KEY = "i"
+AUTO_LEVELS_HOTKEY = "a"
+PAUSE_KEY = " "
+LOOP_HOTKEY = "l"
+NEXT_KEY = "n"
+# 循环播放的配置键
+LOOP_KEY = "Loop"
+# 循环播放时提前该秒数预启动片头备用解码管道（播放列表则预热下一个视频）
+_LOOP_STANDBY_LEAD = 2.0
+# 跳转热键 -> 秒数（左右 ±5 秒，上下 ±60 秒）
+_SEEK_KEYS = {"left": -5, "right": 5, "down": -60, "up": 60}
+
+# 色调热键 -> (参数, 步长)
+_TONE_KEYS = {
+    "[": ("Brightness", -8), "]": ("Brightness", 8),
+    "-": ("Contrast", -0.1), "=": ("Contrast", 0.1), "+": ("Contrast", 0.1),
+    ",": ("Gamma", -0.1), ".": ("Gamma", 0.1),
+    "1": ("BlackLevel", -8), "2": ("BlackLevel", 8),
+    "3": ("WhiteLevel", -8), "4": ("WhiteLevel", 8),
+}
+
+# 状态行显示的色调参数名
+_TONE_LABELS = {
+    "Brightness": "亮度", "Contrast": "对比度", "Gamma": "伽马",
+    "BlackLevel": "黑电平", "WhiteLevel": "白电平",
+}
+
+
+def _adjust_tone(tone, key):
+    # 按热键调整色调参数，返回新参数（未识别的键返回 None）
+    tone = dict(tone)
+    if key == TONE_RESET_KEY:
+        return dict(DEFAULT_TONE)
+    if key == TONE_INVERT_KEY:
+        tone["Invert"] = not tone["Invert"]
+        return tone
+    if key not in _TONE_KEYS:
+        return None
+    name, step = _TONE_KEYS[key]
+    value = tone[name] + step
+    tone[name] = round(value, 2) if isinstance(step, float) else value
+    return tone
+
+
+def _tone_text(tone):
+    # 状态行色调摘要（只列出偏离默认值的参数）
+    parts = [f"{label} {tone[k]:g}" for k, label in _TONE_LABELS.items() if tone[k] != DEFAULT_TONE[k]]
+    if tone["Invert"]:
+        parts.append("反相")
+    return (" | " + " ".join(parts)) if parts else ""
+
+
 def _enable_windows_ansi():
     # Windows 控制台启用 ANSI 转义序列
     try:
@@ -48,7 +167,11 @@ def _enable_windows_ansi():
 
 
 class _KeyReader:
-    # 非阻塞读取退出键（q / Esc）
+    # 非阻塞读取播放按键（q / Esc 退出，其余交给播放循环）
+
+    # Windows 功能键第二字节 / ANSI 方向键末字节 -> 键名
+    _WIN_KEYS = {b"H": "up", b"P": "down", b"K": "left", b"M": "right"}
+    _ANSI_KEYS = {"A": "up", "B": "down", "C": "right", "D": "left"}
 
     def __init__(self):
         try:
@@ -73,26 +196,62 @@ class _KeyReader:
         except Exception:
             return None
 
-    def quit_pressed(self):
+    def poll(self):
+        # 取出自上次调用以来的全部按键：普通键为小写字符，功能键为 esc/up/down/left/right
         if self._msvcrt is not None:
-            pressed = False
+            keys = []
             while self._msvcrt.kbhit():
                 ch = self._msvcrt.getch()
-                if ch in (b"q", b"Q", b"\x1b"):
-                    pressed = True
-            return pressed
+                if ch in (b"\x00", b"\xe0"):
+                    name = self._WIN_KEYS.get(self._msvcrt.getch())
+                    if name:
+                        keys.append(name)
+                elif ch == b"\x1b":
+                    keys.append("esc")
+                else:
+                    keys.append(ch.decode("latin-1").lower())
+            return keys
         if not self._posix:
-            return False
+            return []
         import select
         fd, _old = self._posix
         try:
             r, _, _ = select.select([fd], [], [], 0)
             if not r:
-                return False
-            ch = os.read(fd, 1)
-            return ch in (b"q", b"Q", b"\x1b")
+                return []
+            data = os.read(fd, 64).decode("latin-1")
         except Exception:
-            return False
+            return []
+        keys = []
+        i = 0
+        while i < len(data):
+            ch = data[i]
+            if ch == "\x1b":
+                # ESC [ 参数… 末字节 为一整个 CSI 序列（含 ESC [1;5D 等带修饰键的方向键、ESC [3~ 等），
+                # ESC O X 为 SS3 方向键，单独 ESC 为退出
+                lead = data[i + 1:i + 2]
+                if lead == "[":
+                    j = i + 2
+                    while j < len(data) and not "\x40" <= data[j] <= "\x7e":
+                        j += 1
+                    # 末字节为方向键映射到方向键，其余功能键（及读取截断的残缺序列）整体忽略
+                    if j < len(data):
+                        name = self._ANSI_KEYS.get(data[j])
+                        if name:
+                            keys.append(name)
+                    i = j + 1
+                    continue
+                if lead == "O" and i + 2 < len(data):
+                    name = self._ANSI_KEYS.get(data[i + 2])
+                    if name:
+                        keys.append(name)
+                    i += 3
+                    continue
+                keys.append("esc")
+            else:
+                keys.append(ch.lower())
+            i += 1
+        return keys
 
     def close(self):
         # 播放结束恢复终端原始模式
@@ -140,107 +299,627 @@ def _create_progress_bar(current, total, width=50):
     return f"[{bar}] {percent:.1f}%"
 
 
-def play_video(video_path, use_color=False, with_audio=True):
-    # 原始终端 ANSI 播放视频
-    _enable_windows_ansi()
-    _log(f"播放初始化: {video_path} | 彩色={use_color} 音频={with_audio}")
-    out = sys.stdout
+# ---------------------------------------------------------------------------
+# 播放流水线：解码线程 -> 转换线程 -> 主线程输出，阶段间为有界队列
+# ---------------------------------------------------------------------------
+# 各阶段间排队帧数上限（满则上游阻塞等待，形成背压）
+_DECODE_QUEUE = 4
+_OUTPUT_QUEUE = 2
+# 解码环形缓冲槽数：排队中的帧 + 转换线程持有的 1 帧 + 解码线程正在写入的 1 帧
+_DECODE_RING = _DECODE_QUEUE + 2
 
-    # 播放时屏幕被视频占用，ffmpeg 日志先缓冲
-    _playback_logs = []
 
-    def _buf_log(msg):
+def _put(q, item, stop):
+    # 有界队列入队：满则等待，stop 置位时放弃并返回 False
+    while not stop.is_set():
         try:
-            _playback_logs.append(msg)
-        except Exception:
-            pass
-        _log(msg)
+            q.put(item, timeout=0.05)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    # 有界队列出队：空则等待，stop 置位时返回 None
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.05)
+        except queue.Empty:
+            continue
+    return None
+
+
+class _PlaybackClock:
+    # 播放时钟：start 由主线程在音频可闻后设定，各阶段据此判断帧是否已过期
+    # 帧 n 在 start + n * interval 显示；预计写出时下一帧都已到期的帧即为迟到帧
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.start = None
+        self.dropped = 0
+        # 终端写出耗时（指数平滑），慢终端上据此提前丢帧
+        self.output_time = 0.0
+        self._lock = threading.Lock()
+
+    def due(self, n):
+        # 帧 n 的显示时刻（时钟未启动返回 None）
+        start = self.start
+        return None if start is None else start + n * self.interval
+
+    def late(self, n, pending=0):
+        # 帧 n 是否迟到：排在前面的 pending 帧与本帧写完时下一帧的显示时刻已过
+        due = self.due(n + 1)
+        if due is None:
+            return False
+        return time.monotonic() + self.output_time * (pending + 1) > due
+
+    def record_output(self, seconds):
+        self.output_time += 0.2 * (seconds - self.output_time)
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
 
+
+def _decode_stage(cap, converter, frames, clock, stop, log, first=0):
+    # 解码线程：从帧 first 起逐帧读取入队 (帧号, 帧)；迟到帧只 grab 跳过，结束或出错时入队 None
+    # 字符画宽度/彩色模式变化时让解码器按新的采样尺寸/像素格式输出
+    n = first
+    size = None
+    pix_fmt = None
     try:
-        cap = FrameReader(video_path, log=_buf_log)
+        while not stop.is_set():
+            if converter.decode_size != size:
+                size = converter.decode_size
+                cap.set_output_size(*size)
+            if converter.pix_fmt != pix_fmt:
+                pix_fmt = converter.pix_fmt
+                cap.set_pix_fmt(pix_fmt)
+            if clock.late(n):
+                if not cap.grab():
+                    break
+                clock.drop()
+                n += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if not _put(frames, (n, frame), stop):
+                return
+            n += 1
     except Exception as e:
-        _log_error(f"无法打开视频文件（{e}）")
-        print(f"错误: 无法打开视频文件（{e}）")
-        return False
+        log(f"解码线程异常: {e}")
+    _put(frames, None, stop)
 
-    fps = cap.fps or 30.0
-    frame_interval = 1.0 / max(fps, 1.0)
-    video_width = int(cap.width)
-    video_height = int(cap.height)
-    total_frames = int(cap.frame_count)
-    total_duration = cap.duration if cap.duration and cap.duration > 0 else (total_frames / fps if fps else 0.0)
 
-    audio = start_audio(video_path, log=_buf_log) if with_audio else None
-    stop_audio = audio[0] if audio else None
-    get_audio_start = audio[1] if audio else None
-    keys = _KeyReader()
+def _convert_stage(converter, frames, outputs, clock, commands, stop, log):
+    # 转换线程：先应用主线程转来的热键，再把帧转换为终端字节入队；排队中迟到的帧直接丢弃
+    try:
+        while True:
+            item = _get(frames, stop)
+            if item is None:
+                break
+            while True:
+                try:
+                    converter.handle_key(commands.get_nowait())
+                except queue.Empty:
+                    break
+            n, frame = item
+            if clock.late(n, outputs.qsize()):
+                clock.drop()
+                continue
+            if not _put(outputs, (n,) + converter.convert(frame), stop):
+                return
+    except Exception as e:
+        log(f"转换线程异常: {e}")
+    _put(outputs, None, stop)
+
+
+class _Pipeline:
+    # 一组解码/转换线程及其队列；跳转时整组停止，解码器定位后从新位置重建
+
+    def __init__(self, cap, converter, clock, commands, log, first=0):
+        self.cap = cap
+        self.stop = threading.Event()
+        self.frames = queue.Queue(maxsize=_DECODE_QUEUE)
+        self.outputs = queue.Queue(maxsize=_OUTPUT_QUEUE)
+        self.workers = [
+            threading.Thread(target=_decode_stage,
+                             args=(cap, converter, self.frames, clock, self.stop, log, first),
+                             name="playback-decode", daemon=True),
+            threading.Thread(target=_convert_stage,
+                             args=(converter, self.frames, self.outputs, clock, commands,
+                                   self.stop, log),
+                             name="playback-convert", daemon=True),
+        ]
+        for t in self.workers:
+            t.start()
+
+    def wait_first(self, timeout=5.0):
+        # 等首帧转换完成（管道启动/跳转耗时不计入播放时间，否则开头几帧被判迟到）
+        deadline = time.monotonic() + timeout
+        while self.outputs.empty() and self.workers[1].is_alive() and time.monotonic() < deadline:
+            time.sleep(0.005)
 
-    out.write("\033[2J\033[?25l")
-    out.flush()
+    def close(self):
+        # 停止并等两个线程真正退出后才返回：调用方随后会 seek/换用/释放读取器，不能与解码线程并发
+        # 先打断读取器，阻塞中的 read/grab（含启动管道等首帧）随之返回，join 不需要超时
+        self.stop.set()
+        self.cap.interrupt()
+        for t in self.workers:
+            t.join()
 
-    term_width, term_height = _get_terminal_size()
-    ascii_width = _calculate_optimal_width(term_width, term_height, video_width, video_height)
-    last_width = ascii_width
 
-    # 以"音频实际可闻时刻"为视频时钟基准
+def _start_clock(clock, first, audio_start):
+    # 以"音频实际可闻时刻"为基准设定时钟，使帧 first 此刻到期；无音频时以当前时刻为准
     start = time.monotonic()
-    if get_audio_start is not None:
+    if audio_start is not None:
         deadline = time.monotonic() + 3.0
         while time.monotonic() < deadline:
-            astart = get_audio_start()
+            astart = audio_start()
             if astart is not None:
                 start = astart
                 break
             time.sleep(0.01)
+    clock.start = start - first * clock.interval
+
+
+class _FrameConverter:
+    # 转换阶段状态：编码器注册表、增量渲染器、色调/自动电平与字符画宽度
+    # 只在转换线程内读写；热键经命令队列转入，避免与编码并发修改
+
+    def __init__(self, use_color, video_width, video_height):
+        self.use_color = use_color
+        self.video_width = video_width
+        self.video_height = video_height
+        self.aspect = video_height / video_width
+        self.render_mode = load_render_mode()
+        self.renderer = DeltaRenderer() if _read_config().get("DeltaRender", True) else None
+        self.registry = EncoderRegistry(self.render_mode)
+        self.encoder = None
+        self.tone = current_tone()
+        self.tone_changed = False
+        self.auto_levels = load_auto_levels()
+        self.auto_changed = False
+        self.levels = AutoLevels(self.tone) if self.auto_levels else None
+        self.width, self.decode_size = self.size_for(video_width, video_height)
+        self._count = 0
+
+    def size_for(self, video_width, video_height):
+        # 按当前终端尺寸计算该视频的 (字符画宽度, 解码尺寸)
+        term_width, term_height = _get_terminal_size()
+        width = _calculate_optimal_width(term_width, term_height, video_width, video_height)
+        return width, _pixel_size(width, video_height / video_width, self.render_mode)
+
+    def set_video(self, video_width, video_height):
+        # 切换到播放列表下一个视频：保留热键改动的状态，按新画面比例重算宽度与解码尺寸
+        # 须在转换线程停止时调用
+        self.video_width = video_width
+        self.video_height = video_height
+        self.aspect = video_height / video_width
+        self.width, self.decode_size = self.size_for(video_width, video_height)
+        self._count = 0
+        self._reset()
+
+    @property
+    def pix_fmt(self):
+        # 灰度输出只需亮度，解码管道直接输出单通道帧
+        return "bgr24" if self.use_color else "gray"
+
+    def _reset(self):
+        if self.renderer is not None:
+            self.renderer.reset()
+
+    def handle_key(self, key):
+        # 播放热键（退出键由主线程处理）
+        if key == CHARSET_KEY:
+            self.registry.cycle()
+        elif key == COLOR_KEY:
+            self.use_color = not self.use_color
+            self._reset()
+        elif key == AUTO_LEVELS_HOTKEY:
+            self.auto_levels = not self.auto_levels
+            self.auto_changed = not self.auto_changed
+            self.levels = AutoLevels(self.tone) if self.auto_levels else None
+            if self.levels is None:
+                # 关闭后恢复手动色调
+                set_tone(self.tone, save=False)
+        else:
+            adjusted = _adjust_tone(self.tone, key)
+            if adjusted is not None:
+                # 只重建 256 项查找表，逐帧开销不变
+                self.tone = set_tone(adjusted, save=False)
+                self.tone_changed = True
+                if self.levels is not None:
+                    self.levels.set_base(self.tone)
+
+    def convert(self, frame):
+        # 帧 -> (终端字节, 字符画行数, 字符画宽度, 状态行模式说明)
+        prefix = b""
+        if self._count % 10 == 0:
+            term_width, term_height = _get_terminal_size()
+            w = _calculate_optimal_width(term_width, term_height, self.video_width, self.video_height)
+            if w != self.width:
+                prefix = b"\033[2J\033[H"
+                self.width = w
+                self.decode_size = _pixel_size(w, self.aspect, self.render_mode)
+                self._reset()
+        self._count += 1
+
+        current = self.registry.current()
+        if current is not self.encoder:
+            # 字符集切换后字形表变化，索引网格相同也须整屏重绘
+            self.encoder = current
+            self._reset()
+        grids = _frame_to_grids(frame, self.width, self.use_color, self.encoder,
+                                self.render_mode, self.levels, self.aspect)
+        data = prefix + _encode_frame(self.encoder, grids, self.renderer)
+        return data, grids[0].shape[0], self.width, self._mode_text()
+
+    def _mode_text(self):
+        text = "全彩" if self.use_color else "灰度"
+        if self.render_mode == "ascii":
+            text += f" | 字符集: {self.registry.name}"
+        if self.render_mode != "halfblock":
+            text += _tone_text(self.tone)
+            if self.levels is not None:
+                text += f" | 自动电平 {self.levels.applied[0]}-{self.levels.applied[1]}"
+        return text
+
+    def finish(self):
+        # 播放结束：保存热键改动的色调/自动电平设置
+        if self.tone_changed:
+            set_tone(self.tone)
+        elif self.levels is not None:
+            # 缓存的编码器仍带自动电平，恢复为手动色调
+            set_tone(self.tone, save=False)
+        if self.auto_changed:
+            _write_config_value(AUTO_LEVELS_KEY, self.auto_levels)
+
+
+class _Prewarm:
+    # 后台预热播放列表中的一个视频：打开读取器，按该视频的解码尺寸/像素格式启动管道并读好首帧，
+    # 有音轨时预启动音频（hold 置位前不出声）；切换时直接接管，免去进程启动与首帧等待
+
+    def __init__(self, index, path, converter, with_audio, log):
+        self.index = index
+        self.path = path
+        self.cap = None
+        self.audio = None
+        self.hold = threading.Event()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(converter, with_audio, log),
+                                        name="playlist-prewarm", daemon=True)
+        self._thread.start()
+
+    def _run(self, converter, with_audio, log):
+        try:
+            cap = FrameReader(self.path, log=log, pipe_scale=True, ring=_DECODE_RING)
+            self.cap = cap
+            _, size = converter.size_for(int(cap.src_width), int(cap.src_height))
+            cap.set_output_size(*size)
+            cap.set_pix_fmt(converter.pix_fmt)
+            cap.preroll()
+            if with_audio and (cap.info is None or cap.info.has_audio):
+                self.audio = start_audio(self.path, log=log, hold=self.hold)
+        except Exception as e:
+            self.error = e
+
+    def wait(self):
+        # 等预热完成；失败（无法打开等）返回 False
+        self._thread.join()
+        return self.error is None and self.cap is not None
+
+    def take(self):
+        # 接管读取器与音频；音频仍静音，调用方在新视频首帧就绪、起播时刻到达后置位 hold 才出声
+        self.wait()
+        cap, audio, self.cap, self.audio = self.cap, self.audio, None, None
+        return cap, audio
 
-    idx = 0
-    try:
-        while True:
-            if idx % 10 == 0:
-                term_width, term_height = _get_terminal_size()
-                w = _calculate_optimal_width(term_width, term_height, video_width, video_height)
-                if w != last_width:
-                    out.write("\033[2J\033[H")
-                    last_width = w
-                ascii_width = w
+    def close(self):
+        # 放弃预热：停止音频、释放读取器
+        self.wait()
+        if self.audio:
+            self.audio[0]()
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = self.audio = None
 
-            ret, frame = cap.read()
-            if not ret:
-                break
 
-            ascii_frame = _frame_to_terminal_text(frame, ascii_width, use_color)
-            idx += 1
-
-            color_mode_text = "全彩" if use_color else "灰度"
-            performance_text = f" | 分辨率: {ascii_width}x{int(ascii_width * (video_height / video_width) * 0.5)}"
-            progress_info = (
-                f"平均帧率: {idx / max(time.monotonic() - start, 1e-6):.1f} FPS"
-                f" | 原视频帧: {idx}/{total_frames} | {color_mode_text}{performance_text}"
-            )
-            elapsed = time.monotonic() - start
-            if total_duration > 0:
-                progress_bar = _create_progress_bar(elapsed, total_duration, max(10, ascii_width // 2))
-            else:
-                progress_bar = _create_progress_bar(idx, total_frames, max(10, ascii_width // 2))
+def play_video(video_path, use_color=False, with_audio=True):
+    # 原始终端 ANSI 播放视频；video_path 为路径列表时依次连续播放（播放列表），
+    # 当前视频临近结尾时预热下一个，切换不回菜单、不重新启动界面
+    _enable_windows_ansi()
+    paths = list(video_path) if isinstance(video_path, (list, tuple)) else [video_path]
+    _log(f"播放初始化: {paths[0] if len(paths) == 1 else f'播放列表 {len(paths)} 个视频'}"
+         f" | 彩色={use_color} 音频={with_audio}")
+    out = sys.stdout
 
-            output = f"{ascii_frame}\n\n{progress_info} {progress_bar}"
+    # 播放时屏幕被视频占用，ffmpeg 日志先缓冲
+    _playback_logs = []
 
-            out.write("\033[H" + output + "\033[0m")
-            out.flush()
+    def _buf_log(msg):
+        try:
+            _playback_logs.append(msg)
+        except Exception:
+            pass
+        _log(msg)
 
-            if keys.quit_pressed():
-                break
+    # 播放列表中无法打开的视频跳过
+    cap = None
+    track = 0
+    for track, video_path in enumerate(paths):
+        try:
+            cap = FrameReader(video_path, log=_buf_log, pipe_scale=True, ring=_DECODE_RING)
+            break
+        except Exception as e:
+            _log_error(f"无法打开视频文件（{e}）")
+            print(f"错误: 无法打开视频文件 {video_path}（{e}）")
+    if cap is None:
+        return False
+
+    def _set_track(reader, path):
+        # 切换当前视频：读取器、帧率/时长等信息；关键帧索引清空，按需重建（见 _want_index）
+        nonlocal cap, video_path, fps, frame_interval, video_width, video_height
+        nonlocal total_frames, total_duration, index, track_audio
+        cap, video_path = reader, path
+        fps = cap.fps or 30.0
+        frame_interval = 1.0 / max(fps, 1.0)
+        video_width = int(cap.src_width)
+        video_height = int(cap.src_height)
+        total_frames = int(cap.frame_count)
+        total_duration = cap.duration if cap.duration and cap.duration > 0 else (total_frames / fps if fps else 0.0)
+        index = None
+        # 探测确认无音轨时不启动音频（否则会空等音频起播超时）
+        track_audio = with_audio and not (cap.info is not None and not cap.info.has_audio)
+
+    fps = frame_interval = total_duration = 0.0
+    video_width = video_height = total_frames = 0
+    index = None
+    track_audio = False
+    _set_track(cap, video_path)
+
+    # 解码/转换线程先行预填队列，与音频启动并行
+    converter = _FrameConverter(use_color, video_width, video_height)
+    clock = _PlaybackClock(frame_interval)
+    commands = queue.Queue()
+    pipeline = _Pipeline(cap, converter, clock, commands, _buf_log)
+    pipeline.wait_first()
+    audio = [None]
+
+    def _resume(first):
+        # 从帧 first 起（重新）开始计时：音频同步从对应时刻起播
+        if audio[0]:
+            audio[0][0]()
+        audio[0] = start_audio(video_path, log=_buf_log,
+                               start_seconds=first * frame_interval) if track_audio else None
+        _start_clock(clock, first, audio[0][1] if audio[0] else None)
+
+    def _pause():
+        clock.start = None
+        if audio[0]:
+            audio[0][0]()
+            audio[0] = None
+
+    def _want_index():
+        # 首次按跳转键或暂停时才在后台构建关键帧索引（需扫描整个文件，不拖慢起播与切换曲目）
+        nonlocal index
+        if index is None and total_frames > 0:
+            index = KeyframeIndex(video_path, log=_buf_log)
+
+    def _seek_target(current, seconds):
+        # 跳转目标帧：关键帧索引就绪且最近关键帧离目标不远时落在关键帧上（解码器直接从该处起解）
+        # 索引未就绪时精确跳转
+        target = max(0, min(current + int(round(seconds * fps)), max(0, total_frames - 1)))
+        if index is not None:
+            kt = index.snap(target * frame_interval, current * frame_interval,
+                            1 if seconds > 0 else -1)
+            if kt is not None and abs(kt - target * frame_interval) <= abs(seconds):
+                return int(round(kt * fps)), True
+        return target, False
 
-            delay = (start + idx * frame_interval) - time.monotonic()
+    keys = _KeyReader()
+
+    out.write("\033[2J\033[?25l")
+    out.flush()
+
+    def _status(frame_no, rows, ascii_width, mode_text, paused=False):
+        # 字符画下方第二行的状态行
+        performance_text = f" | 分辨率: {ascii_width}x{int(ascii_width * (video_height / video_width) * 0.5)}"
+        progress_info = (
+            f"平均帧率: {shown / max(time.monotonic() - rate_start, 1e-6):.1f} FPS"
+            f" | 原视频帧: {frame_no + 1}/{total_frames} | 丢帧: {clock.dropped}"
+            f" | {mode_text}{performance_text}"
+        )
+        if len(paths) > 1:
+            progress_info += f" | 列表 {track + 1}/{len(paths)}"
+        if loop:
+            progress_info += " | 循环"
+        if paused:
+            progress_info = "已暂停 | " + progress_info
+        if total_duration > 0:
+            progress_bar = _create_progress_bar((frame_no + 1) * frame_interval, total_duration,
+                                                max(10, ascii_width // 2))
+        else:
+            progress_bar = _create_progress_bar(frame_no + 1, total_frames, max(10, ascii_width // 2))
+        return f"\033[0m\033[{rows + 2};1H{progress_info} {progress_bar}\033[K".encode("utf-8")
+
+    def _next_track():
+        # 播放列表中下一个视频的序号：末尾时循环回到第一个，不循环返回 None
+        if track + 1 < len(paths):
+            return track + 1
+        return 0 if loop else None
+
+    _resume(0)
+    rate_start = time.monotonic()
+    shown = 0
+    last = None
+    paused = False
+    loop = bool(_read_config().get(LOOP_KEY, False))
+    loop_changed = False
+    standby = False
+    prewarm = None
+    try:
+        while True:
+            pressed = keys.poll()
+            if any(k in QUIT_KEYS for k in pressed):
+                break
+            seek = 0
+            skip = False
+            for key in pressed:
+                if key == PAUSE_KEY:
+                    paused = not paused
+                    if paused:
+                        _want_index()
+                        _pause()
+                        if last is not None:
+                            _write_bytes(out, _status(*last, paused=True))
+                            out.flush()
+                    else:
+                        _resume(last[0] + 1 if last is not None else 0)
+                        rate_start, shown = time.monotonic(), 0
+                elif key in _SEEK_KEYS:
+                    _want_index()
+                    seek += _SEEK_KEYS[key]
+                elif key == LOOP_HOTKEY:
+                    loop = not loop
+                    loop_changed = not loop_changed
+                    if not loop and standby:
+                        cap.drop_standby()
+                        standby = False
+                elif key == NEXT_KEY and len(paths) > 1:
+                    skip = True
+                else:
+                    commands.put(key)
+            if seek and total_frames > 0:
+                current = last[0] if last is not None else 0
+                target, keyframe = _seek_target(current, seek)
+                _pause()
+                pipeline.close()
+                # 队列中已转换未显示的帧被丢弃，增量渲染须从整帧重绘开始
+                converter._reset()
+                cap.seek(target, keyframe=keyframe)
+                pipeline = _Pipeline(cap, converter, clock, commands, _buf_log, first=target)
+                pipeline.wait_first()
+                if paused:
+                    # 暂停中跳转：显示新位置的首帧，保持暂停
+                    item = _get(pipeline.outputs, pipeline.stop)
+                    if item is not None:
+                        last = (item[0],) + item[2:]
+                        _write_bytes(out, item[1] + _status(*last, paused=True))
+                        out.flush()
+                    continue
+                _resume(target)
+                rate_start, shown = time.monotonic(), 0
+                standby = False
+            if paused and not skip:
+                time.sleep(0.03)
+                continue
+
+            item = None
+            if not skip:
+                try:
+                    item = pipeline.outputs.get(timeout=0.05)
+                except queue.Empty:
+                    if pipeline.workers[1].is_alive():
+                        continue
+            if item is None and len(paths) > 1:
+                # 播放列表：切到下一个视频（已预热时直接接管读取器与音频），无法打开的跳过
+                # 自然播完时新视频首帧排在上一视频末帧的显示时长之后
+                end_at = clock.due(last[0] + 1) if last is not None and not skip else None
+                _pause()
+                pipeline.close()
+                nxt = _next_track()
+                while nxt is not None:
+                    if prewarm is None or prewarm.index != nxt:
+                        if prewarm is not None:
+                            prewarm.close()
+                        prewarm = _Prewarm(nxt, paths[nxt], converter, with_audio,
+                                           _buf_log)
+                    warm, prewarm = prewarm, None
+                    if warm.wait():
+                        break
+                    _buf_log(f"跳过无法打开的视频: {warm.path}（{warm.error}）")
+                    warm.close()
+                    track = nxt
+                    nxt = _next_track()
+                if nxt is None:
+                    break
+                reader, warm_audio = warm.take()
+                cap.release()
+                track = nxt
+                _set_track(reader, warm.path)
+                converter.set_video(video_width, video_height)
+                clock = _PlaybackClock(frame_interval)
+                out.write("\033[2J")
+                pipeline = _Pipeline(cap, converter, clock, commands, _buf_log)
+                pipeline.wait_first()
+                if end_at is not None and end_at > time.monotonic():
+                    time.sleep(end_at - time.monotonic())
+                if warm_audio and track_audio:
+                    audio[0] = warm_audio
+                    warm.hold.set()
+                    _start_clock(clock, 0, warm_audio[1])
+                else:
+                    if warm_audio:
+                        warm_audio[0]()
+                    _resume(0)
+                rate_start, shown = time.monotonic(), 0
+                last = None
+                paused = False
+                standby = False
+                continue
+            if item is None:
+                if not loop or total_frames <= 0:
+                    break
+                # 循环：回到片头（备用管道已就绪时直接换用），音频同步重启
+                _pause()
+                pipeline.close()
+                cap.seek(0)
+                pipeline = _Pipeline(cap, converter, clock, commands, _buf_log)
+                pipeline.wait_first()
+                _resume(0)
+                rate_start, shown = time.monotonic(), 0
+                standby = False
+                continue
+            frame_no, frame_bytes, rows, ascii_width, color_mode_text = item
+            shown += 1
+
+            # 到显示时刻才输出；迟到帧已在解码/转换阶段丢弃
+            delay = clock.due(frame_no) - time.monotonic()
             if delay > 0:
                 time.sleep(delay)
+
+            last = (frame_no, rows, ascii_width, color_mode_text)
+            t_write = time.monotonic()
+            _write_bytes(out, frame_bytes + _status(*last))
+            out.flush()
+            clock.record_output(time.monotonic() - t_write)
+            if not standby and total_frames > 0 and frame_no >= total_frames - _LOOP_STANDBY_LEAD * fps:
+                if len(paths) > 1:
+                    # 播放列表：预热下一个视频
+                    nxt = _next_track()
+                    if nxt is not None and (prewarm is None or prewarm.index != nxt):
+                        if prewarm is not None:
+                            prewarm.close()
+                        prewarm = _Prewarm(nxt, paths[nxt], converter, with_audio, _buf_log)
+                    standby = nxt is not None
+                elif loop:
+                    standby = cap.prepare_standby(0)
     except KeyboardInterrupt:
         pass
     finally:
+        pipeline.close()
+        if prewarm is not None:
+            prewarm.close()
         cap.release()
         keys.close()
-        if stop_audio:
-            stop_audio()
+        if audio[0]:
+            audio[0][0]()
+        converter.finish()
+        if loop_changed:
+            _write_config_value(LOOP_KEY, loop)
         out.write("\033[0m\033[?25h\033[2J\033[H")
         out.flush()
         # 播放结束后打印缓冲日志
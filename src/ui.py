@@ -9,8 +9,12 @@ from textual.widgets import (
 )
 from textual.containers import Vertical, Horizontal, ScrollableContainer
 
-from utils import _list_verified_decode_backends, _log
-from ascii_art import reload_charset, ASCII_CHARS
+from utils import _list_verified_decode_backends, _refresh_hw_accel, _log
+from ascii_art import (
+    reload_charset, current_charset,
+    COLOR_DEPTHS, load_color_depth, set_color_depth,
+    RENDER_MODES, load_render_mode, set_render_mode,
+)
 from dialogs import SelectingScreen, select_output_path, _gui_available
 
 
@@ -52,6 +56,8 @@ class MenuApp(App):
             ListItem(Label("导出为视频"), id="export"),
             ListItem(Label("以灰度模式播放视频"), id="play_gray_audio"),
             ListItem(Label("以全彩模式播放视频"), id="play_color_audio"),
+            ListItem(Label(self._color_depth_text(), id="color_depth_label"), id="color_depth"),
+            ListItem(Label(self._render_mode_text(), id="render_mode_label"), id="render_mode"),
             ListItem(Label("刷新配置文件"), id="reload_config"),
             ListItem(Label("退出"), id="quit"),
         )
@@ -69,9 +75,15 @@ class MenuApp(App):
         elif event.item.id == "play_color_audio":
             _log("菜单：播放全彩色视频（带音频）")
             self._pick_and_play(True)
+        elif event.item.id == "color_depth":
+            self._cycle_color_depth()
+        elif event.item.id == "render_mode":
+            self._cycle_render_mode()
         elif event.item.id == "reload_config":
             chars = reload_charset()
             _log("菜单：刷新配置文件")
+            self._refresh_color_depth()
+            self._refresh_render_mode()
             self.notify(
                 f"配置已刷新，字符集已重新加载：{chars}",
                 markup=False,
@@ -80,6 +92,46 @@ class MenuApp(App):
             _log("菜单：退出")
             self.app.exit(result="quit")
 
+    def _color_depth_text(self):
+        # 色深菜单项文案
+        return f"彩色色深：{COLOR_DEPTHS[load_color_depth()]}"
+
+    def _refresh_color_depth(self):
+        # 刷新色深菜单项文案
+        try:
+            self.query_one("#color_depth_label", Label).update(self._color_depth_text())
+        except Exception:
+            pass
+
+    def _cycle_color_depth(self):
+        # 依次切换 64 色 / 真彩色 / 256 色 / 16 色
+        names = list(COLOR_DEPTHS)
+        cur = load_color_depth()
+        name = set_color_depth(names[(names.index(cur) + 1) % len(names)])
+        _log(f"菜单：切换彩色色深为 {name}")
+        self._refresh_color_depth()
+        self.notify(f"彩色色深已切换为：{COLOR_DEPTHS[name]}", markup=False)
+
+    def _render_mode_text(self):
+        # 渲染模式菜单项文案
+        return f"终端渲染模式：{RENDER_MODES[load_render_mode()]}"
+
+    def _refresh_render_mode(self):
+        # 刷新渲染模式菜单项文案
+        try:
+            self.query_one("#render_mode_label", Label).update(self._render_mode_text())
+        except Exception:
+            pass
+
+    def _cycle_render_mode(self):
+        # 依次切换 字符 / 半块 / 盲文点阵
+        names = list(RENDER_MODES)
+        cur = load_render_mode()
+        mode = set_render_mode(names[(names.index(cur) + 1) % len(names)])
+        _log(f"菜单：切换终端渲染模式为 {mode}")
+        self._refresh_render_mode()
+        self.notify(f"终端渲染模式已切换为：{RENDER_MODES[mode]}", markup=False)
+
     def _after_export_pick(self, path):
         # 选片后：无则回菜单，有则进入设置面板
         self.pop_screen()
@@ -105,7 +157,8 @@ class MenuApp(App):
 
 class ExportSettingsScreen(Screen):
 
-    BINDINGS = [("escape", "back_to_menu", "返回主菜单")]
+    BINDINGS = [("escape", "back_to_menu", "返回主菜单"),
+                ("f5", "refresh_hw_accel", "重新检测硬件加速")]
 
     CSS = """
     Screen { align: center top; }
@@ -138,7 +191,7 @@ class ExportSettingsScreen(Screen):
         self.video_path = video_path
         self.src_w, self.src_h, self.src_fps = 0, 0, 0.0
         try:
-            _, self.cell_w, self.cell_h = _exporter()[1](ASCII_CHARS)
+            _, self.cell_w, self.cell_h = _exporter()[1](current_charset())
         except Exception:
             self.cell_w, self.cell_h = 10, 20
         self.rec_w, self.rec_h = 160, 120
@@ -305,8 +358,18 @@ class ExportSettingsScreen(Screen):
         # Esc：返回主菜单
         self.app.pop_screen()
 
+    def action_refresh_hw_accel(self):
+        # F5：清除能力缓存，后台重新探测解码后端
+        self.notify("正在重新检测硬件加速…")
+        self.run_worker(self._refresh_hw_accel, thread=True)
+
+    def _refresh_hw_accel(self):
+        # 后台线程：清缓存后重新探测
+        _refresh_hw_accel()
+        self._init_hw_accel()
+
     def _init_hw_accel(self):
-        # 后台线程：探测可用解码后端
+        # 后台线程：探测可用解码后端（有磁盘缓存时直接读取）
         self._decode_backends = _list_verified_decode_backends()
         self.app.call_from_thread(self._apply_hw_accel)
 
@@ -588,8 +651,11 @@ class ExportProgressScreen(Screen):
 # ---------------------------------------------------------------------------
 
 def _probe_video(path):
-    # 探测视频宽、高、帧率
-    from decoder import FrameReader
+    # 探测视频宽、高、帧率（探测结果有磁盘缓存，重复打开不再启动解码）
+    from decoder import FrameReader, probe_media
+    info = probe_media(path, log=lambda msg: None)
+    if info is not None:
+        return info.width, info.height, info.fps
     cap = FrameReader(path, log=lambda msg: None)
     w, h, fps = cap.width, cap.height, cap.fps
     cap.release()
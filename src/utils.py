@@ -1,4 +1,5 @@
 # 共享基础设施
+import json
 import logging
 import math
 import os
@@ -61,6 +62,16 @@ def _app_dir():
     return os.getcwd()
 
 
+def _cache_dir():
+    # 磁盘缓存目录（程序目录下 cache/，首次使用时创建）
+    path = os.path.join(_app_dir(), "cache")
+    try:
+        os.makedirs(path, exist_ok=True)
+    except Exception:
+        pass
+    return path
+
+
 # ---------------------------------------------------------------------------
 # 持久日志文件（程序目录，启动即清空）
 # ---------------------------------------------------------------------------
@@ -167,7 +178,8 @@ def _forward_stderr(proc, log):
                 if not raw:
                     break
                 line = raw.decode("utf-8", "replace").rstrip("\r\n")
-                if line:
+                # 主动终止的进程（_stopping）不再转发其收尾报错（如 Broken pipe）
+                if line and not getattr(proc, "_stopping", False):
                     log(line)
         except Exception:
             pass
@@ -180,6 +192,89 @@ def _forward_stderr(proc, log):
     threading.Thread(target=_pump, daemon=True).start()
 
 
+# ---------------------------------------------------------------------------
+# 硬件加速能力磁盘缓存：按 ffmpeg 路径/大小/版本校验，换了 ffmpeg 自动失效
+# ---------------------------------------------------------------------------
+_HW_CACHE_FILE = "hwaccel.json"
+_HW_CACHE = None
+_HW_CACHE_LOCK = threading.Lock()
+
+
+def _ffmpeg_version(ff):
+    # ffmpeg -version 首行
+    try:
+        r = subprocess.run([ff, "-hide_banner", "-version"],
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                           text=True, timeout=5,
+                           creationflags=_CREATE_NO_WINDOW)
+        return (r.stdout or "").splitlines()[0].strip()
+    except Exception:
+        return ""
+
+
+def _hw_cache_path():
+    # 能力缓存文件路径
+    return os.path.join(_cache_dir(), _HW_CACHE_FILE)
+
+
+def _hw_cache(ff):
+    # 读入并校验能力缓存：路径、大小一致且（修改时间一致或版本一致）才沿用
+    # 修改时间一致时信任记录的版本，省去每次启动一次 -version 子进程
+    global _HW_CACHE
+    if _HW_CACHE is not None:
+        return _HW_CACHE
+    try:
+        st = os.stat(ff)
+        ident = {"path": os.path.abspath(ff), "size": st.st_size, "mtime": st.st_mtime_ns}
+    except OSError:
+        ident = {"path": ff, "size": 0, "mtime": 0}
+    data = {}
+    try:
+        with open(_hw_cache_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        pass
+    old = data.get("ffmpeg") if isinstance(data, dict) else None
+    same = (isinstance(old, dict) and old.get("path") == ident["path"]
+            and old.get("size") == ident["size"])
+    if same and old.get("mtime") == ident["mtime"]:
+        ident["version"] = old.get("version", "")
+    else:
+        ident["version"] = _ffmpeg_version(ff)
+        same = same and old.get("version") == ident["version"]
+    _HW_CACHE = data if same else {}
+    _HW_CACHE["ffmpeg"] = ident
+    return _HW_CACHE
+
+
+def _store_hw_cache(ff, name, value):
+    # 写入一项能力结果并落盘（临时文件替换）
+    with _HW_CACHE_LOCK:
+        cache = _hw_cache(ff)
+        cache[name] = value
+        path = _hw_cache_path()
+        try:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+        except Exception:
+            pass
+
+
+def _refresh_hw_accel():
+    # 丢弃内存与磁盘中的能力缓存，下次使用时重新探测与验证
+    global _HW_ACCEL, _HW_CACHE
+    with _HW_CACHE_LOCK:
+        _HW_ACCEL = None
+        _HW_CACHE = None
+        try:
+            os.remove(_hw_cache_path())
+        except Exception:
+            pass
+    _log("硬件加速能力缓存已清除，将重新检测")
+
+
 # ---------------------------------------------------------------------------
 # 硬件加速探测
 # ---------------------------------------------------------------------------
@@ -212,6 +307,17 @@ def _probe_hw_accel():
     if not ff:
         _HW_ACCEL = {"decode": [], "encode_h264": []}
         return _HW_ACCEL
+    with _HW_CACHE_LOCK:
+        cached = _hw_cache(ff).get("accel")
+    if isinstance(cached, dict):
+        try:
+            _HW_ACCEL = {
+                "decode": [tuple(a) for a in cached["decode"]],
+                "encode_h264": [(name, list(params)) for name, params in cached["encode_h264"]],
+            }
+            return _HW_ACCEL
+        except Exception:
+            pass
 
     hwaccels = set()
     listed_encoders = set()
@@ -262,6 +368,7 @@ def _probe_hw_accel():
             encode_h264.append((enc_name, enc_params))
 
     _HW_ACCEL = {"decode": decode, "encode_h264": encode_h264}
+    _store_hw_cache(ff, "accel", _HW_ACCEL)
     return _HW_ACCEL
 
 
@@ -310,7 +417,25 @@ def _verify_decode_backend(decode_args):
 
 
 def _list_verified_decode_backends():
-    # 经验证可用的解码后端列表
+    # 经验证可用的解码后端列表（验证结果随能力缓存落盘）
+    ff = _ffmpeg_exe()
+    if ff:
+        with _HW_CACHE_LOCK:
+            cached = _hw_cache(ff).get("verified_decode")
+        if isinstance(cached, list):
+            try:
+                return [(label, tuple(args) if args else None) for label, args in cached]
+            except Exception:
+                pass
+    items = _verify_decode_backends()
+    if ff:
+        _store_hw_cache(ff, "verified_decode",
+                        [[label, list(args) if args else None] for label, args in items])
+    return items
+
+
+def _verify_decode_backends():
+    # 逐个解码测试视频验证解码后端
     hw = _probe_hw_accel()
     result = []
     _LABELS = {